@@ -19,52 +19,172 @@ python benchmark.py tests --runs 5 --xsb-path /usr/local/bin/xsb
 
 from __future__ import annotations
 import argparse
+import gc
+import hashlib
+import os
 import re
-import subprocess
+import shutil
+import threading
 import time
 import statistics
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
 
 from graphql import (
+    DocumentNode,
     GraphQLList,
     GraphQLNonNull,
     GraphQLScalarType,
+    GraphQLSchema,
+    assert_valid_schema,
     build_ast_schema,
-    graphql_sync,
+    execute_sync,
     parse,
+    validate,
+)
+from sqlalchemy import (
+    Column,
+    Index,
+    MetaData,
+    Table,
+    Text,
+    bindparam,
+    create_engine,
+    event,
+    select,
 )
-from sqlalchemy import Column, MetaData, Table, Text, create_engine, select
 from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.sql import alias
-from ariadne import ObjectType, QueryType, gql, make_executable_schema
+from ariadne import ObjectType, QueryType
 
 from cleanup import clean
+from translation_cache import scratch_dir, translate_cached, write_atomic
+from xsb_worker import XSBWorker
+
+# Per-schema memo tables for the type helpers below, keyed by id(typ).
+# GraphQL type objects are singletons within a schema, so one lookup
+# replaces the wrapper walk on every resolver call. Entries keep the type
+# itself alongside the result, which pins it so its id cannot be reused.
+_unwrap_cache: Dict[int, Tuple[Any, Any]] = {}
+_is_scalar_cache: Dict[int, Tuple[Any, bool]] = {}
+_returns_list_cache: Dict[int, Tuple[Any, bool]] = {}
+
 
-try:
-    from querybridge.translator import translate_graphql_to_xsb
-except ImportError:
-    from translator import translate_graphql_to_xsb
+def clear_type_caches() -> None:
+    """Forget memoized type information (call when switching schemas)."""
+    _unwrap_cache.clear()
+    _is_scalar_cache.clear()
+    _returns_list_cache.clear()
 
 
 def unwrap(typ):
-    while isinstance(typ, (GraphQLNonNull, GraphQLList)):
-        typ = typ.of_type
-    return typ
+    hit = _unwrap_cache.get(id(typ))
+    if hit is not None:
+        return hit[1]
+    res = typ
+    while isinstance(res, (GraphQLNonNull, GraphQLList)):
+        res = res.of_type
+    _unwrap_cache[id(typ)] = (typ, res)
+    return res
 
 
 def is_scalar(typ) -> bool:
-    return isinstance(unwrap(typ), GraphQLScalarType)
+    hit = _is_scalar_cache.get(id(typ))
+    if hit is not None:
+        return hit[1]
+    res = isinstance(unwrap(typ), GraphQLScalarType)
+    _is_scalar_cache[id(typ)] = (typ, res)
+    return res
 
 
 def returns_list(typ) -> bool:
-    return (
+    hit = _returns_list_cache.get(id(typ))
+    if hit is not None:
+        return hit[1]
+    res = (
         isinstance(typ, GraphQLList)
         or (
             isinstance(typ, GraphQLNonNull)
             and isinstance(typ.of_type, GraphQLList)
         )
     )
+    _returns_list_cache[id(typ)] = (typ, res)
+    return res
+
+
+# Durability settings are pointless for a throwaway in-memory database.
+_SQLITE_PRAGMAS = (
+    "journal_mode=MEMORY",
+    "synchronous=OFF",
+    "temp_store=MEMORY",
+    "locking_mode=EXCLUSIVE",
+    "cache_size=-65536",  # 64 MiB, so no page is ever evicted mid-run
+)
+
+
+def create_memory_engine() -> Engine:
+    """
+    Create an in-memory SQLite engine backed by a single pooled connection,
+    with journaling and fsync disabled on connect.
+    """
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_conn, _):
+        cur = dbapi_conn.cursor()
+        for pragma in _SQLITE_PRAGMAS:
+            cur.execute(f"PRAGMA {pragma}")
+        cur.close()
+
+    return engine
+
+
+# One fact per line, surrounding whitespace allowed. Comment and blank
+# lines never match, so the whole file is scanned in a single pass.
+FACT_RE = re.compile(r"^[ \t]*(\w+)\((.*)\)\.[ \t\r]*$", re.MULTILINE)
+
+
+# One fact argument: a double-quoted string or single-quoted atom (either
+# may contain commas) or a bare token, with surrounding whitespace, always
+# followed by a comma.
+_ARG_RE = re.compile(r"""\s*(?:"([^"]*)"|'([^']*)'|([^,]*?))\s*,""")
+
+
+def split_args(blob: str) -> List[str]:
+    """Split a fact's argument list, dropping whitespace and quotes."""
+    # the trailing comma lets every argument, including the last, match
+    return [dq or sq or bare for dq, sq, bare in _ARG_RE.findall(blob + ",")]
+
+
+# SQLite's default host parameter limit on older builds; multi-row
+# INSERTs are sized to stay under it.
+_MAX_SQL_PARAMS = 999
+
+
+def bulk_insert(cur, table: str, ncols: int, rows: Iterable[List[str]]) -> None:
+    """
+    Insert `rows` into `table` as multi-row `INSERT ... VALUES (..), (..)`
+    statements, so SQLite parses and steps one statement per batch rather
+    than per row. A short final batch goes through executemany.
+    """
+    batch = max(1, _MAX_SQL_PARAMS // ncols)
+    row_sql = f"({', '.join('?' * ncols)})"
+    head = f'INSERT INTO "{table}" VALUES '
+    full_sql = head + ", ".join([row_sql] * batch)
+
+    chunk: List[List[str]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == batch:
+            cur.execute(full_sql, [v for r in chunk for v in r])
+            chunk.clear()
+    if chunk:
+        cur.executemany(head + row_sql, chunk)
 
 
 def load_facts(engine: Engine, facts_path: Path) -> Dict[str, Table]:
@@ -72,26 +192,15 @@ def load_facts(engine: Engine, facts_path: Path) -> Dict[str, Table]:
     Parse `facts.P` with mixed arity, create tables, and insert rows.
     """
     metadata = MetaData()
-    lines = [
-        line.strip()
-        for line in facts_path.read_text().splitlines()
-        if line.strip() and not line.strip().startswith("%")
-    ]
-
-    parsed: List[Tuple[str, List[str]]] = []
-    pattern = re.compile(r"^(\w+)\((.*)\)\.$")
-    for line in lines:
-        match = pattern.match(line)
-        if not match:
-            continue
-        pred, blob = match.groups()
-        parts = [part.strip().strip('"') for part in blob.split(",")]
-        parsed.append((pred, parts))
-
-    # determine maximum arity per predicate
+    by_pred: Dict[str, List[List[str]]] = {}
     arity: Dict[str, int] = {}
-    for pred, parts in parsed:
-        arity[pred] = max(arity.get(pred, 0), len(parts))
+    for m in FACT_RE.finditer(facts_path.read_text()):
+        pred = m.group(1)
+        parts = split_args(m.group(2))
+        by_pred.setdefault(pred, []).append(parts)
+        # track maximum arity per predicate
+        if len(parts) > arity.get(pred, 0):
+            arity[pred] = len(parts)
 
     # create tables
     tables: Dict[str, Table] = {}
@@ -101,112 +210,250 @@ def load_facts(engine: Engine, facts_path: Path) -> Dict[str, Table]:
         table.create(bind=engine)
         tables[pred] = table
 
-    # insert rows, padding with None
+    # bulk insert on the DBAPI cursor, all inside a single transaction;
+    # rows are padded with None lazily instead of built as column dicts
     with engine.begin() as conn:
-        for pred, parts in parsed:
-            table = tables[pred]
-            ncols = len(table.columns)
-            padded = parts + [None] * (ncols - len(parts))
-            conn.execute(table.insert().values({f"arg{i+1}": padded[i] for i in range(ncols)}))
+        cur = conn.connection.cursor()
+        for pred, rows in by_pred.items():
+            ncols = arity[pred]
+            bulk_insert(
+                cur, pred, ncols,
+                (parts + [None] * (ncols - len(parts)) for parts in rows),
+            )
+        cur.close()
+
+    # index the lookup column after loading so inserts stay cheap, then
+    # refresh planner statistics so SQLite actually picks the indexes
+    for pred, table in tables.items():
+        Index(f"ix_{pred}_arg1", table.c.arg1).create(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
 
     return tables
 
 
-def make_root_resolver(obj_name: str, tables: Dict[str, Table]):
-    base_name = f"{obj_name.lower()}_ext"
+# Upper bound on ids per IN (...) lookup, well below SQLite's host
+# parameter limit.
+_MAX_IN_IDS = 500
+
+
+def queue_ids(ctx: dict, type_name: str, objs) -> None:
+    """
+    Record the ids of freshly resolved `type_name` objects so the first
+    field lookup on any of them can fetch rows for all siblings at once.
+    """
+    if objs:
+        ctx["pending"].setdefault(type_name, []).extend(o["__id"] for o in objs)
+
+
+def load_children(
+    ctx: dict, parent_type: str, tbl_name: str, sql_prefix: str, pid: str
+) -> List[str]:
+    """
+    DataLoader-style lookup of the non-null `arg2` values for `pid` in
+    `tbl_name`. On a miss, every queued `parent_type` id not yet loaded
+    for this table is fetched with one `WHERE arg1 IN (...)` query,
+    run on the raw sqlite3 cursor using the precomputed `sql_prefix`.
+    """
+    loader = ctx["loaders"].setdefault(tbl_name, {})
+    vals = loader.get(pid)
+    if vals is not None:
+        return vals
+
+    ids = {pid}
+    ids.update(i for i in ctx["pending"].get(parent_type, ()) if i not in loader)
+    ids = list(ids)
+    for i in ids:
+        loader[i] = []
+
+    cur = ctx["raw_cur"]
+    for start in range(0, len(ids), _MAX_IN_IDS):
+        chunk = ids[start:start + _MAX_IN_IDS]
+        sql = sql_prefix + ",".join("?" * len(chunk)) + ")"
+        for arg1, arg2 in cur.execute(sql, chunk):
+            if arg2 is not None:
+                loader[arg1].append(arg2)
+    return loader[pid]
+
+
+def prepare_field_sql(
+    parent_type: str, field_names, table_names: FrozenSet[str]
+) -> Dict[str, Tuple[str, str]]:
+    """
+    Resolve the backing table of every `parent_type` field once and pair
+    it with the SQL prefix used by `load_children`. Fields without a
+    table are left out.
+    """
+    lower = parent_type.lower()
+    prepared: Dict[str, Tuple[str, str]] = {}
+    for field in field_names:
+        tbl_name = next(
+            (n for n in (f"{lower}_{field}_ext", f"{field}_ext") if n in table_names),
+            None,
+        )
+        if tbl_name is not None:
+            prepared[field] = (
+                tbl_name,
+                f"SELECT arg1, arg2 FROM {tbl_name} WHERE arg1 IN (",
+            )
+    return prepared
+
+
+# Loaded databases keyed by the SHA-1 of their facts file, so folders
+# sharing identical facts (within one worker process) load them once.
+_DB_CACHE: Dict[str, Tuple[Engine, Dict[str, Table]]] = {}
+
+
+@lru_cache(maxsize=64)
+def _file_digest(path_str: str, mtime_ns: int) -> str:
+    return hashlib.sha1(Path(path_str).read_bytes()).hexdigest()
+
+
+def facts_digest(facts_path: Path) -> str:
+    """SHA-1 of `facts_path`, re-hashed only when the file's mtime changes."""
+    resolved = facts_path.resolve()
+    return _file_digest(str(resolved), resolved.stat().st_mtime_ns)
+
+
+def load_database(facts_path: Path) -> Tuple[Engine, Dict[str, Table]]:
+    """Return an in-memory engine holding `facts_path`, reusing earlier loads."""
+    digest = facts_digest(facts_path)
+    cached = _DB_CACHE.get(digest)
+    if cached is None:
+        engine = create_memory_engine()
+        cached = _DB_CACHE[digest] = (engine, load_facts(engine, facts_path))
+    return cached
+
+
+def make_root_resolver(obj_name: str, table_names: FrozenSet[str], arg_names):
+    lower = obj_name.lower()
+    base_name = f"{lower}_ext"
+    has_base = base_name in table_names
+
+    # resolve each declared argument to its filter table up front
+    arg_tbl_map: Dict[str, str] = {}
+    for key in arg_names:
+        for cand in (f"{lower}_{key}_ext", f"{key}_ext"):
+            if cand in table_names:
+                arg_tbl_map[key] = cand
+                break
 
     def resolver(_, info, **kwargs):
-        conn = info.context["conn"]
-        tbls = info.context["tables"]
-        if base_name not in tbls:
+        if not has_base:
             return [] if returns_list(info.return_type) else None
 
+        # aliases of the same root field with equal arguments share one query
+        root_cache = info.context["root_cache"]
+        key = (base_name, tuple(sorted(kwargs.items())))
+        objs = root_cache.get(key)
+        if objs is None:
+            objs = root_cache[key] = fetch_roots(info.context, kwargs)
+            queue_ids(info.context, obj_name, objs)
+
+        if returns_list(info.return_type):
+            return objs
+        return objs[0] if objs else None
+
+    # one compiled statement per combination of supplied filter arguments,
+    # kept as SQL text plus parameter order so repeated calls skip the
+    # join construction, the compiler and SQLAlchemy's result wrapping
+    stmt_cache: Dict[Tuple[str, ...], Tuple[str, Tuple[str, ...]]] = {}
+
+    def fetch_roots(ctx: dict, kwargs: dict) -> List[dict]:
+        keys = tuple(k for k in kwargs if k in arg_tbl_map)
+        prepared = stmt_cache.get(keys)
+        if prepared is None:
+            compiled = build_stmt(ctx["tables"], keys).compile(
+                dialect=ctx["dialect"]
+            )
+            prepared = stmt_cache[keys] = (
+                compiled.string,
+                tuple(compiled.positiontup or ()),
+            )
+        sql, order = prepared
+        rows = ctx["raw_cur"].execute(sql, [kwargs[k] for k in order])
+        return [{"__id": v} for (v,) in rows.fetchall()]
+
+    def build_stmt(tbls: Dict[str, Table], keys: Tuple[str, ...]):
         base_alias = alias(tbls[base_name], obj_name)
         conditions = []
         src = base_alias
 
-        for key, val in kwargs.items():
-            cand_names = [f"{obj_name.lower()}_{key}_ext", f"{key}_ext"]
-            for cand in cand_names:
-                if cand in tbls:
-                    arg_alias = alias(tbls[cand], f"{obj_name}_{key}")
-                    src = src.join(arg_alias, base_alias.c.arg1 == arg_alias.c.arg1)
-                    conditions.append(arg_alias.c.arg2 == val)
-                    break
+        for key in keys:
+            arg_alias = alias(tbls[arg_tbl_map[key]], f"{obj_name}_{key}")
+            src = src.join(arg_alias, base_alias.c.arg1 == arg_alias.c.arg1)
+            conditions.append(arg_alias.c.arg2 == bindparam(key))
 
         stmt = select(base_alias.c.arg1).select_from(src)
         for cond in conditions:
             stmt = stmt.where(cond)
-
-        rows = conn.execute(stmt).fetchall()
-        objs = [{"__id": row[0]} for row in rows]
-        if returns_list(info.return_type):
-            return objs
-        return objs[0] if objs else None
+        return stmt
 
     return resolver
 
 
-def make_field_resolver(parent_type: str, tables: Dict[str, Table]):
-    lower = parent_type.lower()
+def make_field_resolver(
+    parent_type: str,
+    return_type,
+    lookup: Optional[Tuple[str, str]],
+):
+    """
+    Build the resolver for one field of `parent_type`. The return type's
+    shape and the backing table are fixed here, so the resolver itself is
+    a straight lookup plus result shaping.
+    """
+    lst = returns_list(return_type)
+
+    if lookup is None:
+        def missing(parent, info, **_):
+            if parent is None:
+                return None
+            return [] if lst else None
+
+        return missing
+
+    tbl_name, sql_prefix = lookup
+    scalar = is_scalar(return_type)
+    child_type = unwrap(return_type).name
 
     def resolver(parent, info, **_):
         if parent is None:
             return None
 
-        conn = info.context["conn"]
-        tbls = info.context["tables"]
-        field = info.field_name
-        pid = parent["__id"]
-        ret_typ = info.return_type
-
-        tbl_name = next(
-            (n for n in (f"{lower}_{field}_ext", f"{field}_ext") if n in tbls),
-            None,
+        vals = load_children(
+            info.context, parent_type, tbl_name, sql_prefix, parent["__id"]
         )
-        if tbl_name is None:
-            return [] if returns_list(ret_typ) else None
-
-        tbl = tbls[tbl_name]
-        if is_scalar(ret_typ):
-            rows = conn.execute(
-                select(tbl.c.arg2).where(tbl.c.arg1 == pid)
-            ).fetchall()
-            vals = [r[0] for r in rows if r[0] is not None]
-            if returns_list(ret_typ):
+        if scalar:
+            if lst:
                 return vals
             return vals[0] if vals else ""
 
-        rows = conn.execute(
-            select(tbl.c.arg2).where(tbl.c.arg1 == pid)
-        ).fetchall()
-        kids = [{"__id": r[0]} for r in rows if r[0] is not None]
-        if returns_list(ret_typ):
+        kids = [{"__id": v} for v in vals]
+        queue_ids(info.context, child_type, kids)
+        if lst:
             return kids
         return kids[0] if kids else None
 
     return resolver
 
 
-def run_sqlite_case(
-    engine: Engine,
-    tables: Dict[str, Table],
-    schema_path: Path,
-    query_path: Path,
-    runs: int,
-) -> Tuple[int, float, float, float, dict]:
+@lru_cache(maxsize=None)
+def build_schema(schema_path: str, table_names: FrozenSet[str]) -> GraphQLSchema:
     """
-    Execute the GraphQL query via Ariadne + SQLite. Return:
-    (row_count, min_time, avg_time, max_time, last_data)
+    Build the executable Ariadne schema for `schema_path` once and reuse it
+    for every run against a database exposing `table_names`.
     """
-    schema_sdl = gql(schema_path.read_text())
-    gql_schema = build_ast_schema(parse(schema_sdl))
+    # Parse and build the SDL once. Resolvers are bound onto this schema
+    # directly: make_executable_schema would parse and build it again.
+    gql_schema = build_ast_schema(parse(Path(schema_path).read_text()))
 
     query_type = QueryType()
     root_type = gql_schema.get_type("Query")
     for field_name, field_def in root_type.fields.items():
         base = unwrap(field_def.type).name
-        query_type.set_field(field_name, make_root_resolver(base, tables))
+        query_type.set_field(
+            field_name, make_root_resolver(base, table_names, field_def.args)
+        )
 
     object_types: List[ObjectType] = []
     for type_name, gql_type in gql_schema.type_map.items():
@@ -215,153 +462,316 @@ def run_sqlite_case(
         if not hasattr(gql_type, "fields"):
             continue
         obj = ObjectType(type_name)
-        fallback = make_field_resolver(type_name, tables)
-        for fname in gql_type.fields:
-            obj.set_field(fname, fallback)
+        prepared = prepare_field_sql(type_name, gql_type.fields, table_names)
+        for fname, field_def in gql_type.fields.items():
+            obj.set_field(
+                fname,
+                make_field_resolver(type_name, field_def.type, prepared.get(fname)),
+            )
         object_types.append(obj)
 
-    schema_exec = make_executable_schema(
-        schema_sdl, query_type, *object_types
-    )
-    query_str = query_path.read_text()
-
-    def count_scalars(data) -> int:
-        if data is None:
-            return 0
-        if isinstance(data, (str, int, float, bool)):
-            return 1
-        if isinstance(data, list):
-            return sum(count_scalars(x) for x in data)
-        if isinstance(data, dict):
-            return sum(count_scalars(v) for v in data.values())
-        return 0
-
-    times: List[float] = []
-    last_data = None
-    with engine.connect() as conn:
-        ctx = {"conn": conn, "tables": tables}
-        for _ in range(runs):
-            t0 = time.perf_counter()
-            result = graphql_sync(
-                schema_exec, query_str, context_value=ctx
-            )
-            t1 = time.perf_counter()
+    for bindable in (query_type, *object_types):
+        bindable.bind_to_schema(gql_schema)
+    assert_valid_schema(gql_schema)
+    return gql_schema
+
+
+def count_scalars(root) -> int:
+    """Count the scalar leaves of a GraphQL result without recursing."""
+    stack = deque([root])
+    n = 0
+    while stack:
+        x = stack.pop()
+        t = type(x)
+        if t is dict:
+            stack.extend(x.values())
+        elif t is list:
+            stack.extend(x)
+        elif t in (str, int, float, bool):
+            n += 1
+    return n
+
+
+# Timed sections may overlap across threads (the XSB session runs beside
+# the SQLite case), so the collector is paused by reference count and only
+# re-enabled when the last section ends.
+_gc_lock = threading.Lock()
+_gc_pauses = 0
+_gc_was_enabled = False
+
+
+@contextmanager
+def gc_paused():
+    """Keep the cyclic garbage collector from running inside timed code."""
+    global _gc_pauses, _gc_was_enabled
+    with _gc_lock:
+        if _gc_pauses == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.collect()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _gc_lock:
+            _gc_pauses -= 1
+            if _gc_pauses == 0 and _gc_was_enabled:
+                gc.enable()
+
+
+def summarize(times_ns: List[int]) -> Tuple[float, float]:
+    """
+    Return the (median, population stdev) of `times_ns`, still in
+    nanoseconds; units are only converted when the report is formatted.
+    """
+    return statistics.median(times_ns), statistics.pstdev(times_ns)
+
+
+def time_query(
+    schema_exec: GraphQLSchema,
+    document: DocumentNode,
+    ctx: dict,
+    iters: int,
+) -> Tuple[List[int], dict]:
+    """
+    Execute an already parsed and validated `document` `iters` times,
+    after one untimed warm-up run. Return the per-run timings in
+    nanoseconds and the data of the last run.
+    """
+    def request_ctx() -> dict:
+        # batching and memo state is request-scoped so no run reuses
+        # another's rows
+        return {**ctx, "loaders": {}, "pending": {}, "root_cache": {}}
+
+    # warm-up: absorb first-call compilation and cache misses
+    result = execute_sync(schema_exec, document, context_value=request_ctx())
+    if result.errors:
+        raise RuntimeError(result.errors)
+
+    times: List[int] = []
+    last_data = result.data
+    with gc_paused():
+        for _ in range(iters):
+            run_ctx = request_ctx()
+            t0 = time.perf_counter_ns()
+            result = execute_sync(schema_exec, document, context_value=run_ctx)
+            t1 = time.perf_counter_ns()
             if result.errors:
                 raise RuntimeError(result.errors)
             times.append(t1 - t0)
             last_data = result.data
+    return times, last_data
 
-    row_count = count_scalars(last_data)
-    return row_count, min(times), statistics.mean(times), max(times), last_data
 
-
-def run_xsb_variant(
-    xsb_path: str,
-    facts_path: Path,
+def run_sqlite_case(
+    engine: Engine,
+    tables: Dict[str, Table],
     schema_path: Path,
     query_path: Path,
     runs: int,
-    apply_demand: bool,
-) -> Tuple[int, float, float, float, List[str]]:
+) -> Tuple[int, float, float, dict]:
     """
-    Generate XSB code, write a Prolog driver that consults facts and the
-    generated rules, runs `ans(...)` once, and captures timing. Returns:
-    (row_count, min_time, avg_time, max_time, output_lines)
+    Execute the GraphQL query via Ariadne + SQLite. Return:
+    (row_count, median_ns, stdev_ns, last_data)
     """
-    code = translate_graphql_to_xsb(
-        str(schema_path), str(query_path), apply_demand
-    )
+    schema_exec = build_schema(str(schema_path), frozenset(tables))
+
+    # parse and validate once; only execution is timed
+    document = parse(query_path.read_text())
+    errors = validate(schema_exec, document)
+    if errors:
+        raise RuntimeError(errors)
+
+    # the whole case runs on one checked-out DBAPI connection (the same one
+    # load_facts filled, via StaticPool); SQLAlchemy only compiles SQL
+    raw_conn = engine.raw_connection()
+    try:
+        ctx = {
+            "dialect": engine.dialect,
+            "tables": tables,
+            "raw_cur": raw_conn.cursor(),
+        }
+        times, last_data = time_query(schema_exec, document, ctx, runs)
+    finally:
+        raw_conn.close()
+
+    row_count = count_scalars(last_data)
+    return (row_count, *summarize(times), last_data)
+
+
+# Scratch directories of `driver_dir`, one per content digest
+DRIVER_ROOT = Path(scratch_dir()) / "querybridge_xwam"
+
+
+def driver_dir(facts_path: Path, programs: List[str]) -> Path:
+    """
+    Content-addressed scratch directory for one folder's XSB sessions. It
+    holds a link to the facts, one driver per program, and the .xwam
+    files XSB compiles from them. It is kept between runs so compiled code
+    is reused, until an invocation no longer uses it (`prune_driver_dirs`).
+    """
+    digest = hashlib.sha1(
+        b"|".join([facts_digest(facts_path).encode(), *(p.encode() for p in programs)])
+    ).hexdigest()
+    work_dir = DRIVER_ROOT / digest
+    work_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        (work_dir / facts_path.name).symlink_to(facts_path.resolve())
+    except FileExistsError:
+        pass
+    return work_dir
+
+
+def prune_driver_dirs(used: Iterable[str]) -> None:
+    """Remove the `driver_dir` directories whose names are not in `used`."""
+    keep = frozenset(used)
+    try:
+        with os.scandir(DRIVER_ROOT) as entries:
+            stale = [e.path for e in entries if e.name not in keep]
+    except FileNotFoundError:
+        return
+    for path in stale:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+# Head of the generated answer rule; its arguments give the arity
+ANS_HEAD_RE = re.compile(r"^ans\(([^()]*)\)", re.MULTILINE)
+
+# seconds any one XSB goal may take before the folder's benchmark fails
+XSB_TIMEOUT = 300
+
+
+def xsb_program(
+    schema_path: Path, query_path: Path, apply_demand: bool
+) -> Tuple[str, str]:
+    """
+    Generate XSB code for one variant, the goal that asks for its first
+    `ans(...)` answer and the goal that prints every answer, one per line.
+    Returns (code, ans_goal, answers_goal).
+    """
+    code = translate_cached(schema_path, query_path, apply_demand)
 
     # Compute ans arity
-    import re
-    m = re.search(r"^ans\(([^)]*)\)", code, re.MULTILINE)
+    m = ANS_HEAD_RE.search(code)
     if m:
         args = m.group(1).strip()
         arity = 0 if not args else args.count(',') + 1
     else:
         arity = 0
 
-    driver_name = facts_path.parent / f"run_{'demand' if apply_demand else 'nodemand'}.P"
-    ans_unders = ','.join('_' for _ in range(arity))
-    ans_directive = f"\n:- ans({ans_unders}), halt."
-
-    with open(driver_name, 'w') as drv:
-        drv.write(f":- ['{facts_path.name}'].")
-        drv.write(code)
-        drv.write("")
-        drv.write(ans_directive)
-
-    times: List[float] = []
-    output_lines: List[str] = []
-    for _ in range(runs):
-        t0 = time.perf_counter()
-        proc = subprocess.run(
-            [xsb_path, '-e', f"['{driver_name.name}']."],
-            cwd=facts_path.parent,
-            capture_output=True,
-            text=True,
-        )
-        t1 = time.perf_counter()
-        if proc.returncode != 0:
-            raise RuntimeError(f"XSB error: {proc.stderr}")
-        times.append(t1 - t0)
-        for ln in proc.stdout.splitlines():
-            if ln and ln.strip() != 'DONE':
-                output_lines.append(ln.strip())
+    ans_head = f"ans({','.join('_' for _ in range(arity))})" if arity else "ans"
+    # `\+ \+` leaves no bindings for the toplevel to report; an error
+    # reaches XSBWorker, which raises it
+    ans_goal = f"\\+ \\+ {ans_head}"
+
+    ans_args = ','.join(f"_A{i}" for i in range(arity))
+    ans_call = f"ans({ans_args})" if arity else "ans"
+    answers_goal = f"({ans_call}, write([{ans_args}]), nl, fail ; true)"
+    return code, ans_goal, answers_goal
+
+
+def run_xsb_variants(
+    xsb_path: str,
+    facts_path: Path,
+    schema_path: Path,
+    query_path: Path,
+    runs: int,
+) -> Tuple[str, List[Tuple[int, float, float, List[str]]]]:
+    """
+    Time both XSB variants, each in its own interactive XSB session, so
+    the demand rules cannot lean on rules left by the no-demand ones: the
+    facts and one variant's rules are loaded, then `runs` executions of the
+    first `ans(...)` answer are timed. Timings exclude XSB startup and loading.
+    Every answer is then printed, untimed, so the variants can be compared.
+    Returns the name of the sessions' `driver_dir` and, no-demand first,
+    one entry per variant:
+    (row_count, median_ns, stdev_ns, answer_lines)
+    """
+    programs = [
+        xsb_program(schema_path, query_path, apply_demand)
+        for apply_demand in (False, True)
+    ]
+    work_dir = driver_dir(facts_path, [code for code, _, _ in programs])
+
+    results = []
+    for (code, ans_goal, answers_goal), name in zip(programs, ("nodemand", "demand")):
+        driver_name = work_dir / f"run_{name}.P"
+        if not driver_name.exists():
+            write_atomic(driver_name, f"{code}\n")
 
-    driver_name.unlink()
-    row_count = len(output_lines)
-    return row_count, min(times), statistics.mean(times), max(times), output_lines
+        with XSBWorker(xsb_path, cwd=work_dir, timeout=XSB_TIMEOUT) as xsb:
+            xsb.load_compiled(work_dir / facts_path.name)
+            xsb.load_compiled(driver_name)
+
+            times: List[int] = []
+            with gc_paused():
+                for _ in range(runs):
+                    t0 = time.perf_counter_ns()
+                    xsb.run(ans_goal)
+                    t1 = time.perf_counter_ns()
+                    times.append(t1 - t0)
+
+            answers = xsb.run(answers_goal)
+            results.append((len(answers), *summarize(times), answers))
+    return work_dir.name, results
 
 
 def bench_folder(
     folder: Path,
     runs: int,
     xsb_path: str,
-) -> None:
-    print(f"=== {folder.name} ===")
-    engine = create_engine("sqlite:///:memory:")
+) -> Tuple[List[str], str]:
+    """
+    Benchmark one test folder and return the report lines, so folders can
+    run in worker processes and still be printed in order, along with the
+    name of the `driver_dir` its XSB sessions used.
+    """
+    lines = [f"=== {folder.name} ==="]
+    clear_type_caches()
     facts_path = folder / "facts.P"
-    tables = load_facts(engine, facts_path)
-
-    # SQLite execution
-    _, s_min, s_avg, s_max, _ = run_sqlite_case(
-        engine,
-        tables,
-        folder / "schema.graphql",
-        folder / "query.graphql",
-        runs,
-    )
-    print(
-        f"SQLite timing: min/avg/max = {s_min:.6f}/{s_avg:.6f}/{s_max:.6f} s"
-    )
+    schema_path = folder / "schema.graphql"
+    query_path = folder / "query.graphql"
+    engine, tables = load_database(facts_path)
+
+    # the XSB sessions only wait on subprocesses, so overlap them with the
+    # in-process SQLite run
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        xsb_runs = pool.submit(
+            run_xsb_variants, xsb_path, facts_path, schema_path, query_path, runs
+        )
+
+        # SQLite execution
+        _, s_med, s_sd, _ = run_sqlite_case(
+            engine,
+            tables,
+            schema_path,
+            query_path,
+            runs,
+        )
+        lines.append(
+            f"SQLite timing:        median/stdev = {s_med / 1e6:.3f}/{s_sd / 1e6:.3f} ms"
+        )
+
+        work_dir, xsb_results = xsb_runs.result()
+        (_, x0_med, x0_sd, out_no), (_, x1_med, x1_sd, out_yes) = xsb_results
 
     # XSB no-demand timing
-    _, x0_min, x0_avg, x0_max, _ = run_xsb_variant(
-        xsb_path,
-        facts_path,
-        folder / "schema.graphql",
-        folder / "query.graphql",
-        runs,
-        False,
-    )
-    print(
-        f"XSB no-demand timing: min/avg/max = {x0_min:.6f}/{x0_avg:.6f}/{x0_max:.6f} s"
+    lines.append(
+        f"XSB no-demand timing: median/stdev = {x0_med / 1e6:.3f}/{x0_sd / 1e6:.3f} ms"
     )
 
     # XSB with demand timing
-    _, x1_min, x1_avg, x1_max, _ = run_xsb_variant(
-        xsb_path,
-        facts_path,
-        folder / "schema.graphql",
-        folder / "query.graphql",
-        runs,
-        True,
-    )
-    print(
-        f"XSB demand timing:    min/avg/max = {x1_min:.6f}/{x1_avg:.6f}/{x1_max:.6f} s"
+    lines.append(
+        f"XSB demand timing:    median/stdev = {x1_med / 1e6:.3f}/{x1_sd / 1e6:.3f} ms"
     )
 
+    # both variants must produce the same answers; compare them as sorted
+    # lists (multiset equality) rather than building hash sets of each
+    if sorted(out_no) != sorted(out_yes):
+        lines.append("WARNING: XSB outputs differ between demand variants")
+
+    return lines, work_dir
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(
@@ -370,16 +780,36 @@ def main() -> None:
     parser.add_argument("tests_root", type=Path, help="Directory containing test case folders")
     parser.add_argument("--runs", type=int, default=5, help="Number of iterations per backend")
     parser.add_argument("--xsb-path", type=str, required=True, help="Path to XSB executable")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=max(1, (os.cpu_count() or 1) // 2),
+        help="Folders benchmarked in parallel (each runs one XSB session at a time)",
+    )
     args = parser.parse_args()
 
+    folders = []
     for sub in sorted(args.tests_root.iterdir()):
         if not sub.is_dir():
             continue
         names = {p.name for p in sub.iterdir()}
         if {"facts.P", "schema.graphql", "query.graphql"}.issubset(names):
-            bench_folder(sub, args.runs, args.xsb_path)
-
-    clean(supress=True)
+            folders.append(sub)
+
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        reports = pool.map(
+            bench_folder,
+            folders,
+            [args.runs] * len(folders),
+            [args.xsb_path] * len(folders),
+        )
+        used = []
+        for lines, work_dir in reports:
+            print("\n".join(lines))
+            used.append(work_dir)
+
+    # drop the compiled drivers of folders or versions no longer benchmarked
+    prune_driver_dirs(used)
+    # keep the compiled facts that tests.py reuses between runs
+    clean(supress=True, keep={"facts.xwam"})
 
 
 if __name__ == "__main__":
@@ -5,48 +5,55 @@ Cleanup script for QueryBridge tests.
 This script cleans up generated files after running tests.
 """
 
+import os
+import re
 import sys
 from pathlib import Path
 
 
-def cleanup_test_directory(test_dir, supress):
-    """Clean up generated files in a test directory."""
+# Files to remove: Prolog files (drivers and generated code), XSB
+# compiled files and XSB log files
+GENERATED_RE = re.compile(r"\.P$|\.xwam(\..*)?$|^xsb_log\.txt$")
+
+# Files to keep
+FILES_TO_KEEP = frozenset({
+    "facts.P",
+    "schema.graphql",
+    "query.graphql",
+    "README.md",
+})
+
+
+def cleanup_test_directory(test_dir, supress, keep=()):
+    """
+    Clean up generated files in a test directory, except those named in
+    `keep`.
+    """
     def log(msg=""):
         if not supress:
             print(msg)
-    # Files to remove
-    patterns = [
-        "*.P",           # All Prolog files except facts.P
-        "*.xwam",        # XSB compiled files
-        "*.xwam.*",
-        "xsb_log.txt",   # XSB log files
-        "run_*.P"        # Run files
-    ]
-    
-    # Files to keep
-    files_to_keep = [
-        "facts.P",
-        "schema.graphql",
-        "query.graphql",
-        "README.md"
-    ]
-    
+
     log(f"Cleaning up directory: {test_dir}")
-    
-    # Remove files matching patterns
-    for pattern in patterns:
-        for file_path in test_dir.glob(pattern):
-            if file_path.name not in files_to_keep:
-                try:
-                    file_path.unlink()
-                    log(f"  Removed: {file_path.name}")
-                except Exception as e:
-                    log(f"  Error removing {file_path.name}: {e}")
+
+    # Remove generated files in a single pass over the directory
+    with os.scandir(test_dir) as entries:
+        for entry in entries:
+            if (entry.name in FILES_TO_KEEP or entry.name in keep
+                    or not GENERATED_RE.search(entry.name)):
+                continue
+            try:
+                os.unlink(entry.path)
+                log(f"  Removed: {entry.name}")
+            except Exception as e:
+                log(f"  Error removing {entry.name}: {e}")
 
 
 
-def clean(supress=False):
-    """Main function to run the cleanup script."""
+def clean(supress=False, keep=()):
+    """
+    Main function to run the cleanup script. Files named in `keep` are left
+    in every test directory.
+    """
     def log(msg=""):
         if not supress:
             print(msg)
@@ -63,9 +70,10 @@ def clean(supress=False):
     # Clean up test directories
     for td in (test_dir, test_dir2):
         if td.exists():
-            for subdir in td.iterdir():
-                if subdir.is_dir():
-                    cleanup_test_directory(subdir, supress)
+            with os.scandir(td) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        cleanup_test_directory(entry.path, supress, keep)
     
     # Remove temporary files in the project root
     for temp_file in root_dir.glob("*.xwam"):
@@ -7,6 +7,8 @@ with support for demand transformation optimization.
 
 from .translator import (
     SchemaType, 
+    TypeKind,
+    ArgKind,
     QueryField, 
     DemandInfo,
     parse_schema,
@@ -17,10 +17,12 @@ with demand transformation for performance optimization.
 
 from __future__ import annotations
 from dataclasses import dataclass, field
-from enum import Enum
-from typing import List, Optional, Set, Tuple, Any
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import os
 import sys
 import argparse
+from functools import lru_cache
 from itertools import count
 
 from graphql import (
@@ -29,6 +31,7 @@ from graphql import (
     FragmentSpreadNode,
     InlineFragmentNode,
     OperationDefinitionNode,
+    SelectionNode,
     TypeNode,
     ListTypeNode,
     NonNullTypeNode,
@@ -38,7 +41,30 @@ from graphql import (
 )
 
 
-@dataclass
+class TypeKind(IntEnum):
+    """Kind tag of a `SchemaType`."""
+    SCALAR = 0
+    OBJECT = 1
+    LIST = 2
+    NON_NULL = 3
+
+
+class ArgKind(IntEnum):
+    """How a query argument filters its field."""
+    EXACT = 0  # equality on the argument's own field
+    MIN = 1    # minX: lower bound on field x
+    MAX = 2    # maxX: upper bound on field x
+    BOOL = 3   # true/false flag
+
+
+# Argument names that look a single record up rather than filter a collection
+_LOOKUP_KEYS = frozenset({"id", "name", "key", "slug", "code"})
+
+# Argument values (lowercased) that make an argument a boolean flag
+_BOOL_LITERALS = frozenset({"true", "false"})
+
+
+@dataclass(slots=True, frozen=True)
 class SchemaType:
     """
     Represents a GraphQL schema type.
@@ -49,52 +75,67 @@ class SchemaType:
     - `list(scalar("User"))` represents a list type like `[User]`
     - `non_null(scalar("String"))` represents a non-null type like `String!`
     """
-    class TypeKind(Enum):
-        SCALAR = "scalar"
-        OBJECT = "object"
-        LIST = "list"
-        NON_NULL = "non_null"
-
     kind: TypeKind
     name: str = ""
     fields: List[Tuple[str, SchemaType]] = field(default_factory=list)
     element_type: Optional[SchemaType] = None
     inner_type: Optional[SchemaType] = None
 
+    # Scalar, list and non-null types are interned: every `String!` in a
+    # schema is the same immutable object. Entries hold their element type,
+    # which keeps the id() in their key from being reused.
+    @classmethod
+    def _interned(cls, key: tuple, **kwargs) -> SchemaType:
+        t = _type_intern.get(key)
+        if t is None:
+            t = _type_intern[key] = cls(**kwargs)
+        return t
+
     @classmethod
     def scalar(cls, name: str) -> SchemaType:
         """Create a scalar schema type."""
-        return cls(kind=cls.TypeKind.SCALAR, name=name)
+        return cls._interned(("S", name), kind=TypeKind.SCALAR, name=name)
 
     @classmethod
     def object(cls, name: str, fields: List[Tuple[str, SchemaType]]) -> SchemaType:
         """Create an object schema type."""
-        return cls(kind=cls.TypeKind.OBJECT, name=name, fields=fields)
+        return cls(kind=TypeKind.OBJECT, name=name, fields=fields)
 
     @classmethod
     def list(cls, element_type: SchemaType) -> SchemaType:
         """Create a list schema type."""
-        return cls(kind=cls.TypeKind.LIST, element_type=element_type)
+        return cls._interned(
+            ("L", id(element_type)), kind=TypeKind.LIST, element_type=element_type
+        )
 
     @classmethod
     def non_null(cls, inner_type: SchemaType) -> SchemaType:
         """Create a non-null schema type."""
-        return cls(kind=cls.TypeKind.NON_NULL, inner_type=inner_type)
+        return cls._interned(
+            ("N", id(inner_type)), kind=TypeKind.NON_NULL, inner_type=inner_type
+        )
 
     def __repr__(self) -> str:
-        if self.kind == self.TypeKind.SCALAR:
+        kind = self.kind
+        if kind is _SCALAR:
             return f"SchemaType.scalar({repr(self.name)})"
-        elif self.kind == self.TypeKind.OBJECT:
+        elif kind is _OBJECT:
             return f"SchemaType.object({repr(self.name)}, {repr(self.fields)})"
-        elif self.kind == self.TypeKind.LIST:
+        elif kind is _LIST:
             return f"SchemaType.list({repr(self.element_type)})"
-        elif self.kind == self.TypeKind.NON_NULL:
+        elif kind is _NON_NULL:
             return f"SchemaType.non_null({repr(self.inner_type)})"
         else:
             return f"SchemaType(kind={repr(self.kind)}, name={repr(self.name)})"
 
 
-@dataclass
+_type_intern: Dict[tuple, SchemaType] = {}
+
+# Enum members are singletons, so kind checks can compare identity
+_SCALAR, _OBJECT, _LIST, _NON_NULL = TypeKind
+
+
+@dataclass(slots=True)
 class QueryField:
     """
     Represents a GraphQL query field with its name, arguments, and subfields.
@@ -122,29 +163,38 @@ class QueryField:
     subfields: List[QueryField] = field(default_factory=list)
     parent_var: str = ""  # Variable representing the parent object
     child_var: str = ""   # Variable representing this field's object
+    # Derived from `arguments` once at construction
+    bound_mask: str = field(init=False, repr=False, compare=False)  # Adornment (B for bound, F for free)
+    bound_vals: List[str] = field(init=False, repr=False, compare=False)  # Bound argument values
+    arg_kinds: List[ArgKind] = field(init=False, repr=False, compare=False)  # Kind of each argument
+    # Some argument is a filter (min/max/boolean) and none is a lookup key
+    is_filtering: bool = field(init=False, repr=False, compare=False)
+    # Per argument, the `_ext` predicate it constrains and the term it binds there
+    arg_terms: List[Tuple[str, str]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.bound_mask = "B" * len(self.arguments) or "_"
+        self.bound_vals = [arg[1] for arg in self.arguments]
+        classified = [classify_argument(name, value, self.child_var) for name, value in self.arguments]
+        self.arg_kinds = [kind for kind, _, _ in classified]
+        self.arg_terms = [(ext_name, term) for _, ext_name, term in classified]
+        self.is_filtering = (
+            any(kind is not ArgKind.EXACT for kind in self.arg_kinds)
+            and not any(name in _LOOKUP_KEYS for name, _ in self.arguments)
+        )
 
     @property
     def is_scalar(self) -> bool:
         """Determine if this field is a scalar (no subfields)"""
         return len(self.subfields) == 0
 
-    @property
-    def bound_mask(self) -> str:
-        """Generate adornment string for this field's arguments (B for bound, F for free)"""
-        return "".join("B" for _ in self.arguments) or "_"
-
-    @property
-    def bound_vals(self) -> List[str]:
-        """Get list of bound argument values"""
-        return [arg[1] for arg in self.arguments]
-
     def __repr__(self) -> str:
         return (f"QueryField(name={repr(self.name)}, "
                 f"arguments={repr(self.arguments)}, "
                 f"subfields={repr(self.subfields)})")
 
 
-@dataclass
+@dataclass(slots=True)
 class DemandInfo:
     """Information about demand transformation for a field"""
     applied: bool = False
@@ -172,29 +222,88 @@ def capitalize(s: str) -> str:
     return s[0].upper() + s[1:]
 
 
+def read_file(path: str) -> str:
+    """Read a whole UTF-8 file, sized by fstat so small files take one read()."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        data = os.read(fd, size)
+        # short reads only happen on very large files or ones still growing
+        while len(data) < size:
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        os.close(fd)
+    return data.decode()
+
+
+# Quoted forms of string literals already formatted; the same argument
+# values recur throughout one query's rules.
+_fmt_cache: Dict[str, str] = {}
+_FMT_CACHE_MAX = 4096
+
+
 def format_value(val: Any) -> str:
     """Format a value for XSB."""
-    if isinstance(val, str):
-        return f'"{val}"'
+    if type(val) is str:
+        quoted = _fmt_cache.get(val)
+        if quoted is None:
+            if len(_fmt_cache) >= _FMT_CACHE_MAX:
+                _fmt_cache.clear()
+            quoted = _fmt_cache[val] = sys.intern('"' + val + '"')
+        return quoted
     if val is None:
         return "null"
+    if isinstance(val, str):
+        return f'"{val}"'
     return str(val)
 
 
+def classify_argument(arg_name: str, arg_value: str, child_var: str) -> Tuple[ArgKind, str, str]:
+    """
+    Classify an argument by its name pattern and value, and return its
+    kind with the `_ext` predicate name it constrains and the term it
+    binds there.
+
+    Min/max arguments bind the rest of their name after "min"/"max"
+    (lowercased) to a variable that is compared afterwards; boolean and
+    exact arguments bind their value directly.
+    """
+    if arg_name.startswith("min"):
+        kind = ArgKind.MIN
+    elif arg_name.startswith("max"):
+        kind = ArgKind.MAX
+    else:
+        # lowercased once for both the check and the bound literal
+        value_lower = arg_value.lower()
+        if value_lower in _BOOL_LITERALS:
+            return ArgKind.BOOL, arg_name, value_lower
+        return ArgKind.EXACT, arg_name, format_value(arg_value)
+    field_name = arg_name[3:].lower()
+    return kind, field_name, f"{field_name.upper()}_{child_var}"
+
+
 #
 # Parsing functions
 #
 
+# Type node class → SchemaType builder. An exact type() lookup replaces
+# the isinstance chain.
+_TYPE_DISPATCH = {
+    NonNullTypeNode: lambda n: SchemaType.non_null(parse_graphql_type(n.type)),
+    ListTypeNode: lambda n: SchemaType.list(parse_graphql_type(n.type)),
+    NamedTypeNode: lambda n: SchemaType.scalar(n.name.value),
+}
+
+
 def parse_graphql_type(type_node: TypeNode) -> SchemaType:
     """Parse a GraphQL type node into a SchemaType."""
-    if isinstance(type_node, NonNullTypeNode):
-        return SchemaType.non_null(parse_graphql_type(type_node.type))
-    elif isinstance(type_node, ListTypeNode):
-        return SchemaType.list(parse_graphql_type(type_node.type))
-    elif isinstance(type_node, NamedTypeNode):
-        return SchemaType.scalar(type_node.name.value)
-    else:
+    build = _TYPE_DISPATCH.get(type(type_node))
+    if build is None:
         raise ValueError(f"Unsupported type node: {type_node}")
+    return build(type_node)
 
 
 def parse_schema(schema_path: str) -> List[SchemaType]:
@@ -205,21 +314,27 @@ def parse_schema(schema_path: str) -> List[SchemaType]:
     representation using the `SchemaType` data structure. It supports basic GraphQL schema
     elements like object types, scalar types, and non-null modifiers.
 
+    Results are cached by file contents, so repeated calls for an unchanged
+    file, or for an identical file at another path, return the same list;
+    callers must not modify it.
+
     Args:
         schema_path: Path to the GraphQL schema file
 
     Returns:
         A list of `SchemaType` representing the parsed schema
     """
-    with open(schema_path, 'r') as f:
-        schema_content = f.read()
+    return _parse_schema_source(read_file(str(schema_path)))
+
 
+@lru_cache(maxsize=256)
+def _parse_schema_source(schema_content: str) -> List[SchemaType]:
     # Parse the schema using graphql-core-3
     document = parse(schema_content)
     schema = build_ast_schema(document)
     type_map = schema.type_map
 
-    result = []
+    result: List[SchemaType] = []
 
     # Process object types
     for type_name, type_def in type_map.items():
@@ -228,7 +343,7 @@ def parse_schema(schema_path: str) -> List[SchemaType]:
             continue
 
         if hasattr(type_def, 'fields'):
-            fields = []
+            fields: List[Tuple[str, SchemaType]] = []
             for field_name, field_def in type_def.fields.items():
                 field_type = parse_graphql_type(field_def.ast_node.type)
                 fields.append((field_name, field_type))
@@ -246,15 +361,21 @@ def parse_query(query_path: str) -> List[QueryField]:
     a list of `QueryField` objects. It uses graphql-core-3 for accurate parsing of
     complex GraphQL queries, including fragments and nested fields.
 
+    Results are cached by file contents, so repeated calls for an unchanged
+    file, or for an identical file at another path, return the same list;
+    callers must not modify it.
+
     Args:
         query_path: Path to the GraphQL query file
 
     Returns:
         A list of `QueryField` representing the parsed query
     """
-    with open(query_path, 'r') as f:
-        query_content = f.read()
+    return _parse_query_source(read_file(str(query_path)))
+
 
+@lru_cache(maxsize=256)
+def _parse_query_source(query_content: str) -> List[QueryField]:
     # Parse the query using graphql-core-3
     document = parse(query_content)
 
@@ -267,62 +388,98 @@ def parse_query(query_path: str) -> List[QueryField]:
 
     # Create variable name generator
     var_counter = count(1)
-    var_cache = {}  # path → variable name (enforces sharing)
+    var_cache: Dict[str, str] = {}  # path → variable name (enforces sharing)
+    fragment_field_cache: Dict[Tuple[str, str], List[QueryField]] = {}  # (fragment name, parent variable) → fields
 
     def fresh_var(base: str) -> str:
         """Generate a fresh variable name based on a base name."""
-        return f"{base.upper()}_{next(var_counter)}"
+        # interned: variables recur in every rule and dedup key that
+        # mentions them, so equality checks become identity checks
+        return sys.intern(f"{base.upper()}_{next(var_counter)}")
 
-    def var_for_path(path: str, base: str) -> str:
+    def var_for_path(path: str, base: str, _cache: Dict[str, str] = var_cache, _fresh: Callable[[str], str] = fresh_var) -> str:
         """Get or create a variable for a specific path."""
-        if path not in var_cache:
-            var_cache[path] = fresh_var(base)
-        return var_cache[path]
+        # defaults bind the cache and generator as fast locals; one lookup on a hit
+        var = _cache.get(path)
+        if var is None:
+            var = _cache[path] = _fresh(base)
+        return var
 
     def build_query_field(node: FieldNode, parent_var: str, parent_path: str) -> QueryField:
-        """Recursively build a QueryField from a FieldNode."""
-        name = node.alias.value if node.alias else node.name.value
-        path = f"{parent_path}.{name}" if parent_path else name
-        child_var = var_for_path(path, name)
-
-        # Process arguments
-        arguments = []
-        for arg in node.arguments or []:
-            arg_name = arg.name.value
-            # Simple string literal argument extraction
-            if hasattr(arg.value, 'value'):
-                arg_value = str(arg.value.value)
-                arguments.append((arg_name, arg_value))
-
-        # Process subfields
-        subfields = []
-        if node.selection_set:
-            for selection in node.selection_set.selections:
-                if isinstance(selection, FieldNode):
-                    subfields.append(build_query_field(selection, child_var, path))
-                elif isinstance(selection, FragmentSpreadNode):
-                    # Include fields from fragment
+        """Build a QueryField tree from a FieldNode."""
+        built: List[QueryField] = []
+        # Depth first on an explicit stack rather than recursing. Entries are
+        # (selection, enclosing field's variable and path, lists the fields
+        # built from the selection are appended to); selections are pushed
+        # reversed so they pop, and take their variables, in document order
+        stack: List[Tuple[SelectionNode, str, str, Tuple[List[QueryField], ...]]] = [
+            (node, parent_var, parent_path, (built,))
+        ]
+        while stack:
+            selection, parent_var, parent_path, targets = stack.pop()
+
+            if isinstance(selection, FieldNode):
+                name = selection.alias.value if selection.alias else selection.name.value
+                path = f"{parent_path}.{name}" if parent_path else name
+                child_var = var_for_path(path, name)
+
+                # Process arguments
+                arguments: List[Tuple[str, str]] = []
+                for arg in selection.arguments or []:
+                    arg_name = arg.name.value
+                    # Simple string literal argument extraction
+                    if hasattr(arg.value, 'value'):
+                        arg_value = str(arg.value.value)
+                        arguments.append((arg_name, arg_value))
+
+                # Create QueryField with parent_var and child_var; its
+                # subfields are appended as their selections are popped
+                query_field = QueryField(
+                    name=name,
+                    arguments=arguments,
+                    subfields=[],
+                    parent_var=parent_var,
+                    child_var=child_var
+                )
+                for target in targets:
+                    target.append(query_field)
+
+                # Process subfields
+                if selection.selection_set:
+                    stack.extend([
+                        (sub_selection, child_var, path, (query_field.subfields,))
+                        for sub_selection in reversed(selection.selection_set.selections)
+                    ])
+            elif isinstance(selection, FragmentSpreadNode):
+                # Include fields from fragment, built once per fragment and
+                # parent variable (variables are path-derived, so the same
+                # key always yields the same fields). A repeated key is only
+                # popped after the first one's fields are fully built.
+                key = (selection.name.value, parent_var)
+                fragment_fields = fragment_field_cache.get(key)
+                if fragment_fields is not None:
+                    for target in targets:
+                        target.extend(fragment_fields)
+                else:
                     fragment = fragment_map[selection.name.value]
-                    for sub_selection in fragment.selection_set.selections:
-                        if isinstance(sub_selection, FieldNode):
-                            subfields.append(build_query_field(sub_selection, child_var, path))
-                elif isinstance(selection, InlineFragmentNode):
-                    # Include fields from inline fragment
-                    for sub_selection in selection.selection_set.selections:
-                        if isinstance(sub_selection, FieldNode):
-                            subfields.append(build_query_field(sub_selection, child_var, path))
-
-        # Create QueryField with parent_var and child_var
-        return QueryField(
-            name=name, 
-            arguments=arguments, 
-            subfields=subfields,
-            parent_var=parent_var,
-            child_var=child_var
-        )
+                    fragment_fields = fragment_field_cache[key] = []
+                    stack.extend([
+                        (sub_selection, parent_var, parent_path, targets + (fragment_fields,))
+                        for sub_selection in reversed(fragment.selection_set.selections)
+                        if isinstance(sub_selection, FieldNode)
+                    ])
+            elif isinstance(selection, InlineFragmentNode):
+                # Include fields from inline fragment
+                stack.extend([
+                    (sub_selection, parent_var, parent_path, targets)
+                    for sub_selection in reversed(selection.selection_set.selections)
+                    if isinstance(sub_selection, FieldNode)
+                ])
+
+        return built[0]
 
     # Extract root-level query fields
-    root_fields = []
+    root_fields: List[QueryField] = []
     for definition in document.definitions:
         # Check for both named and anonymous queries
         if isinstance(definition, OperationDefinitionNode):
@@ -338,7 +495,7 @@ def parse_query(query_path: str) -> List[QueryField]:
 # XSB generation functions with demand transformation
 #
 
-def generate_demand_transformation(node: QueryField, demands: List[str], rules: List[str], seen_demand_rules: Set[str], depth: int = 0) -> DemandInfo:
+def generate_demand_transformation(node: QueryField, demands: List[str], rules: List[str], seen_demand_rules: Set[Tuple], depth: int = 0) -> DemandInfo:
     """
     Generate demand transformation for a query field node.
 
@@ -346,7 +503,8 @@ def generate_demand_transformation(node: QueryField, demands: List[str], rules:
         node: The query field to transform
         demands: List to accumulate demand predicates
         rules: List to accumulate XSB rules
-        seen_demand_rules: Set of already generated demand rules (to avoid duplicates)
+        seen_demand_rules: Keys of already generated demand rules (to avoid duplicates);
+            each key holds exactly the parts its rule text is built from
         depth: Current depth in the query tree
 
     Returns:
@@ -354,15 +512,60 @@ def generate_demand_transformation(node: QueryField, demands: List[str], rules:
     """
     info = DemandInfo()
 
+    # Walk the subtree depth first on an explicit stack rather than
+    # recursing. Each entry is (node, depth, its info, parent, parent's
+    # info, index among the parent's subfields, done). A node is popped
+    # once to emit its own rules and queue its subfields, and once more,
+    # with done set, after its subtree to emit its parent's propagation
+    # rule for it.
+    stack: List[Tuple[QueryField, int, DemandInfo, Optional[QueryField], Optional[DemandInfo], int, bool]] = [
+        (node, depth, info, None, None, 0, False)
+    ]
+    while stack:
+        subfield, sub_depth, sub_info, parent, parent_info, i, done = stack.pop()
+        if not done:
+            _demand_rules_for_node(subfield, demands, rules, seen_demand_rules, sub_depth, sub_info)
+            if sub_info.applied:
+                if parent is not None:
+                    stack.append((subfield, sub_depth, sub_info, parent, parent_info, i, True))
+                stack.extend([
+                    (child, sub_depth + 1, DemandInfo(), subfield, sub_info, j, False)
+                    for j, child in reversed(list(enumerate(subfield.subfields)))
+                ])
+            continue
+
+        # Propagate demand to subfields
+        assert parent is not None and parent_info is not None
+        if i == 0:  # Only add the header comment once
+            rules.append(f"% Propagate demand from {parent.name} to its fields")
+
+        # Create demand propagation rule for this subfield
+        if not subfield.is_scalar:
+            key = ("propagate", sub_info.demand_pred, subfield.parent_var,
+                   parent_info.magic_pred, parent.name, parent.parent_var)
+            if key not in seen_demand_rules:
+                seen_demand_rules.add(key)
+                parent_field = f"{parent.name}_ext"
+                rules.append(
+                    f"{sub_info.demand_pred}({subfield.parent_var}) :- "
+                    f"{parent_info.magic_pred}({parent.parent_var}), "
+                    f"{parent_field}({parent.parent_var}, {subfield.parent_var})."
+                )
+
+    return info
+
+
+def _demand_rules_for_node(node: QueryField, demands: List[str], rules: List[str], seen_demand_rules: Set[Tuple], depth: int, info: DemandInfo) -> None:
+    """Fill in `info` for `node` and emit its own seed, magic and demand rules."""
     # Only apply demand to fields with arguments or to nested fields
     if not node.arguments and depth == 0:
-        return info
+        return
 
     # Determine predicate names
     adornment = node.bound_mask
     info.adornment = adornment
-    demand_pred = f"demand_{node.name}_{adornment}"
-    magic_pred = f"m_{node.name}_{adornment}"
+    demand_pred = sys.intern(f"demand_{node.name}_{adornment}")
+    magic_pred = sys.intern(f"m_{node.name}_{adornment}")
     info.demand_pred = demand_pred
     info.magic_pred = magic_pred
 
@@ -378,66 +581,67 @@ def generate_demand_transformation(node: QueryField, demands: List[str], rules:
         reason = f"it's a nested field at depth {depth}"
 
     if not apply_demand:
-        return info
+        return
 
     info.applied = True
     info.reason = reason
 
     # Create demand rule for root level with arguments
+    # Rules are checked against a key of the parts they are built from, so
+    # duplicates are skipped before any text is formatted
+    bound_vals = tuple(node.bound_vals)
+    key: Tuple
     if depth == 0 and node.arguments:
-        bound_values = ", ".join([format_value(val) for val in node.bound_vals])
-        seed = f"{demand_pred}({bound_values})."
-        if seed not in seen_demand_rules:
+        key = ("seed", demand_pred, bound_vals)
+        if key not in seen_demand_rules:
+            seen_demand_rules.add(key)
+            bound_values = ", ".join([format_value(val) for val in bound_vals])
             demands.append(f"% Seed demand with bound arguments for {node.name}")
-            demands.append(seed)
-            seen_demand_rules.add(seed)
+            demands.append(f"{demand_pred}({bound_values}).")
 
     # Create magic rule
     if node.arguments:
-        args = ", ".join([format_value(val) for val in node.bound_vals])
-        magic_rule = f"{magic_pred}({node.parent_var}) :- {demand_pred}({args})."
+        key = ("magic", magic_pred, node.parent_var, bound_vals)
+        if key not in seen_demand_rules:
+            seen_demand_rules.add(key)
+            args = ", ".join([format_value(val) for val in bound_vals])
+            rules.append(f"% Magic predicate for {node.name}")
+            rules.append(f"{magic_pred}({node.parent_var}) :- {demand_pred}({args}).")
     else:
         if depth > 0:  # For nested fields without arguments
-            parent_field = f"{node.name}_ext"
             # Propagate demand from parent
-            parent_demand = f"% Propagate demand to {node.name} fields"
-            demand_rule = f"{demand_pred}({node.parent_var}) :- m_{parent_field}({node.parent_var})."
-            if demand_rule not in seen_demand_rules:
-                rules.append(parent_demand)
-                rules.append(demand_rule)
-                seen_demand_rules.add(demand_rule)
-
-        magic_rule = f"{magic_pred}({node.parent_var}) :- {demand_pred}({node.parent_var})."
-
-    if magic_rule not in seen_demand_rules:
-        rules.append(f"% Magic predicate for {node.name}")
-        rules.append(magic_rule)
-        seen_demand_rules.add(magic_rule)
-
-    # Process subfields recursively
-    for i, subfield in enumerate(node.subfields):
-        sub_info = generate_demand_transformation(
-            subfield, demands, rules, seen_demand_rules, depth + 1
-        )
-        if sub_info.applied:
-            # Propagate demand to subfields
-            if i == 0:  # Only add the header comment once
-                rules.append(f"% Propagate demand from {node.name} to its fields")
-
-            # Create demand propagation rule for this subfield
-            if not subfield.is_scalar:
+            key = ("demand", demand_pred, node.name, node.parent_var)
+            if key not in seen_demand_rules:
+                seen_demand_rules.add(key)
                 parent_field = f"{node.name}_ext"
-                propagate = (
-                    f"{sub_info.demand_pred}({subfield.parent_var}) :- "
-                    f"{magic_pred}({node.parent_var}), "
-                    f"{parent_field}({node.parent_var}, {subfield.parent_var})."
-                )
+                rules.append(f"% Propagate demand to {node.name} fields")
+                rules.append(f"{demand_pred}({node.parent_var}) :- m_{parent_field}({node.parent_var}).")
 
-                if propagate not in seen_demand_rules:
-                    rules.append(propagate)
-                    seen_demand_rules.add(propagate)
+        key = ("magic", magic_pred, node.parent_var, ())
+        if key not in seen_demand_rules:
+            seen_demand_rules.add(key)
+            rules.append(f"% Magic predicate for {node.name}")
+            rules.append(f"{magic_pred}({node.parent_var}) :- {demand_pred}({node.parent_var}).")
 
-    return info
+
+def filter_record(field: QueryField) -> Optional[Tuple[str, str]]:
+    """
+    Classify an object field with arguments as a filtering collection.
+
+    A field is filtering when some argument is a filter (starts with min/max
+    or is boolean) and none is a direct lookup key (like "name", "id").
+    Its filters then apply to the individual records, bound to a record
+    variable, rather than to the parent.
+
+    Returns:
+        `(singular_name, record_var)` for filtering collections, else None
+    """
+    if field.is_scalar or not field.is_filtering:
+        return None
+
+    # Derive singular name for records (users -> user)
+    singular_name = field.name[:-1] if field.name.endswith("s") else field.name
+    return singular_name, f"{singular_name.upper()}_ID"
 
 
 def generate_predicate_rules(field: QueryField, predicates: List[str], rules: List[str], demand_info: Optional[DemandInfo] = None, path: str = "") -> None:
@@ -451,106 +655,69 @@ def generate_predicate_rules(field: QueryField, predicates: List[str], rules: Li
         demand_info: Optional demand transformation information
         path: Current path in the query (for nested fields)
     """
-    # Determine predicate name using the path for nested fields
-    pred_name = f"{path}{field.name}_result" if path else f"{field.name}_result"
-
-    # Collect variables for field arguments
-    arg_vars = []
-    for arg_name, arg_value in field.arguments:
-        arg_var = f"{arg_name.upper()}"
-        arg_vars.append((arg_var, arg_value))
-    # Generate the predicate signature based on whether it's a scalar or object
-    if field.is_scalar:
-        pred_signature = f"{pred_name}({field.parent_var}, {field.child_var})"
-    else:
-        pred_signature = f"{pred_name}({field.parent_var})"
-
-    # Generate the predicate body
-    body_parts = []
-
-    # Add demand check if applicable
-    if demand_info and demand_info.applied:
-        body_parts.append(f"{demand_info.magic_pred}({field.parent_var})")
-
-    # Initialize filter_parts here
-    filter_parts = []
-    
-    # Add the base predicate
-    if field.is_scalar:
-        # For scalar fields, we need both parent and child variables
-        ext_pred = f"{field.name}_ext({field.parent_var}, {field.child_var})"
-    else:
-        # For object fields, determine the correct approach based on argument patterns
-        ext_pred = f"{field.name}_ext({field.parent_var})"
-
-        # Special handling for fields with arguments
-        if field.arguments and not field.is_scalar:
-            # Determine if this is likely a filtering collection or a single-object lookup
-            # Check if any argument is a filter (starts with min/max or is boolean)
-            has_filter_args = any(
-                arg_name.startswith("min") or arg_name.startswith("max") or 
-                arg_value.lower() in ("true", "false")
-                for arg_name, arg_value in field.arguments
-            )
-            
-            # Check if any arguments match exact name pattern (like "name", "id")
-            # These are typically used for direct lookups rather than filtering
-            has_lookup_args = any(
-                arg_name in ("id", "name", "key", "slug", "code")
-                for arg_name, _ in field.arguments
-            )
-            
-            # If we have filter args, treat this as a collection with filtering
-            if has_filter_args and not has_lookup_args:
-                # This is likely a filtering query (e.g., users with age filters)
-                # Derive singular name for records (users -> user)
-                singular_name = field.name[:-1] if field.name.endswith("s") else field.name
-                
+    # Walk the subtree depth first on an explicit stack of (field, path,
+    # demand info) rather than recursing; only the starting field carries
+    # demand info, and children are pushed reversed so they pop in order
+    stack: List[Tuple[QueryField, str, Optional[DemandInfo]]] = [(field, path, demand_info)]
+    while stack:
+        field, path, demand_info = stack.pop()
+
+        # Determine predicate name using the path for nested fields
+        pred_name = f"{path}{field.name}_result" if path else f"{field.name}_result"
+
+        # The variable filters attach to; rebound below for filtering collections
+        parent_var = field.parent_var
+
+        # Generate the predicate signature based on whether it's a scalar or object
+        if field.is_scalar:
+            pred_signature = f"{pred_name}({field.parent_var}, {field.child_var})"
+        else:
+            pred_signature = f"{pred_name}({field.parent_var})"
+
+        # Generate the predicate body: demand check, base predicate, then
+        # filters, all accumulated in one list and joined once
+        body_parts: List[str] = []
+
+        # Add demand check if applicable
+        if demand_info and demand_info.applied:
+            body_parts.append(f"{demand_info.magic_pred}({field.parent_var})")
+
+        # Add the base predicate
+        if field.is_scalar:
+            # For scalar fields, we need both parent and child variables
+            body_parts.append(f"{field.name}_ext({field.parent_var}, {field.child_var})")
+        else:
+            # For object fields, determine the correct approach based on argument patterns
+            body_parts.append(f"{field.name}_ext({field.parent_var})")
+
+            # Special handling for filtering collections (e.g., users with age filters)
+            record = filter_record(field)
+            if record is not None:
+                singular_name, current_var = record
+
                 # Extract individual records from the container
                 # This connects ROOT to each specific record that will be filtered
-                current_var = f"{singular_name.upper()}_ID"
-                filter_parts.append(f"{singular_name}_ext({field.parent_var}, {current_var})")
-                
+                body_parts.append(f"{singular_name}_ext({parent_var}, {current_var})")
+
                 # Apply all filter queries to the individual records (not to ROOT)
-                # This resets the parent_var for filter conditions to be the ID of the record
-                field.parent_var = current_var
-
-    body_parts.append(ext_pred)
-
-    # Add filters for arguments
-    for arg_name, arg_value in field.arguments:
-        # Generic handling of arguments based on name patterns
-        if arg_name.startswith("min"):
-            # Field name is the rest of the string after "min" with first letter lowercase
-            field_name = arg_name[3:].lower()
-            # In XSB we use @>= for comparison
-            filter_parts.append(f"{field_name}_ext({field.parent_var}, {field_name.upper()}_{field.child_var})")
-            filter_parts.append(f"{field_name.upper()}_{field.child_var} @>= {arg_value}")
-        elif arg_name.startswith("max"):
-            # Field name is the rest of the string after "max" with first letter lowercase
-            field_name = arg_name[3:].lower()
-            # In XSB we use @=< for comparison
-            filter_parts.append(f"{field_name}_ext({field.parent_var}, {field_name.upper()}_{field.child_var})")
-            filter_parts.append(f"{field_name.upper()}_{field.child_var} @=< {arg_value}")
-        elif arg_value.lower() in ("true", "false"):
-            # Handle boolean values
-            bool_val = arg_value.lower()
-            filter_parts.append(f"{arg_name}_ext({field.parent_var}, {bool_val})")
-        else:
-            # Regular exact match filter (default case)
-            filter_parts.append(f"{arg_name}_ext({field.parent_var}, {format_value(arg_value)})")
-    
-    # Add filter conditions to body parts
-    body_parts.extend(filter_parts)
+                parent_var = current_var
+
+        # Add filters for arguments: each constrains its `_ext` predicate on
+        # the precomputed term, and min/max then compare the bound variable
+        # (in XSB we use @>= and @=< for comparison)
+        for (ext_name, term), (_, arg_value), kind in zip(field.arg_terms, field.arguments, field.arg_kinds):
+            body_parts.append(f"{ext_name}_ext({parent_var}, {term})")
+            if kind is ArgKind.MIN:
+                body_parts.append(f"{term} @>= {arg_value}")
+            elif kind is ArgKind.MAX:
+                body_parts.append(f"{term} @=< {arg_value}")
 
-    # Combine into a rule
-    rule = f"{pred_signature} :- {', '.join(body_parts)}."
-    rules.append(rule)
+        # Combine into a rule
+        rules.append("".join((pred_signature, " :- ", ", ".join(body_parts), ".")))
 
-    # Process subfields recursively with updated path
-    new_path = f"{path}{field.name}_" if path else f"{field.name}_"
-    for subfield in field.subfields:
-        generate_predicate_rules(subfield, predicates, rules, None, new_path)
+        # Continue with the subfields under the updated path
+        new_path = f"{path}{field.name}_" if path else f"{field.name}_"
+        stack.extend([(subfield, new_path, None) for subfield in reversed(field.subfields)])
 
 
 def generate_answer_predicate(root_fields: List[QueryField], rules: List[str]) -> None:
@@ -565,43 +732,49 @@ def generate_answer_predicate(root_fields: List[QueryField], rules: List[str]) -
         rules: List to accumulate rules
     """
     # Maps to collect variables and body parts for the answer predicate
-    variable_map = {}  # path -> variable name
-    body_parts = []
-    field_vars = []   # To maintain order of variables in the answer predicate
-
-    def process_field(field: QueryField, path: str = "", parent_path: str = ""):
-        """Recursively process a field and its subfields to build the answer predicate."""
-        # Create the field's variable name
-        current_path = f"{path}{field.name}"
-
-        # For scalar fields, create a variable for the answer predicate
-        if field.is_scalar:
-            # Use capitalized variable name directly
-            var_name = f"{current_path.upper()}"
-            variable_map[current_path] = var_name
-            field_vars.append(var_name)
-
-            # Add the result predicate to body parts
-            if not parent_path:  # Root level scalar field
-                body_parts.append(f"{field.name}_ext(ROOT, {field.child_var})")
-                body_parts.append(f"{field.name}_result(ROOT, {var_name})")
-            else:  # Nested scalar field
-                parent_var = field.parent_var
-                body_parts.append(f"{parent_path}{field.name}_result({parent_var}, {var_name})")
-        else:
-            # For object fields, add the object's predicate but no variable in the answer
-            if not parent_path:  # Root level object
-                body_parts.append(f"{field.name}_ext({field.child_var})")
-                body_parts.append(f"{field.name}_result(ROOT)")
-            else:  # Nested object field
-                parent_var = field.parent_var
-                body_parts.append(f"{parent_path}{field.name}_result({parent_var})")
-
-            # Process all subfields
-            new_path = f"{current_path}_"
-            new_parent_path = f"{current_path}_"
-            for subfield in field.subfields:
-                process_field(subfield, new_path, new_parent_path)
+    variable_map: Dict[str, str] = {}  # path -> variable name
+    body_parts: List[str] = []
+    field_vars: List[str] = []   # To maintain order of variables in the answer predicate
+
+    def process_field(root: QueryField) -> None:
+        """Process a root field and its subfields to build the answer predicate."""
+        # Depth first on an explicit stack of (field, parent path); children
+        # are pushed reversed so they pop in order
+        stack: List[Tuple[QueryField, str]] = [(root, "")]
+        while stack:
+            field, parent_path = stack.pop()
+
+            # Create the field's variable name
+            current_path = f"{parent_path}{field.name}"
+
+            # For scalar fields, create a variable for the answer predicate
+            if field.is_scalar:
+                # Use capitalized variable name directly
+                var_name = f"{current_path.upper()}"
+                variable_map[current_path] = var_name
+                field_vars.append(var_name)
+
+                # Add the result predicate to body parts
+                if not parent_path:  # Root level scalar field
+                    body_parts.append(f"{field.name}_ext(ROOT, {field.child_var})")
+                    body_parts.append(f"{field.name}_result(ROOT, {var_name})")
+                else:  # Nested scalar field
+                    parent_var = field.parent_var
+                    body_parts.append(f"{parent_path}{field.name}_result({parent_var}, {var_name})")
+            else:
+                # For object fields, add the object's predicate but no variable in the answer
+                if not parent_path:  # Root level object
+                    body_parts.append(f"{field.name}_ext({field.child_var})")
+                    body_parts.append(f"{field.name}_result(ROOT)")
+                else:  # Nested object field
+                    # filtering collections are joined on their record variable
+                    record = filter_record(field)
+                    parent_var = record[1] if record is not None else field.parent_var
+                    body_parts.append(f"{parent_path}{field.name}_result({parent_var})")
+
+                # Process all subfields
+                new_parent_path = f"{current_path}_"
+                stack.extend([(subfield, new_parent_path) for subfield in reversed(field.subfields)])
 
     # Process each root field
     for field in root_fields:
@@ -614,73 +787,85 @@ def generate_answer_predicate(root_fields: List[QueryField], rules: List[str]) -
                 body_parts.append(f"{field_pred}({field.child_var}, {subfield.child_var})")
 
     # Remove duplicates from body parts while preserving order
-    unique_body_parts = []
-    seen = set()
+    unique_body_parts: List[str] = []
+    seen: Set[str] = set()
     for part in body_parts:
         if part not in seen:
             unique_body_parts.append(part)
             seen.add(part)
 
-    # Create the answer predicate
+    # Create the answer predicate, after a comment explaining it
+    rules.append("% Final answer predicate combining all query results")
     if field_vars:
         # Use capitalized variables both in the head and in the body
         head = f"ans({', '.join(field_vars)})"
         
         # Handle fields with arguments intelligently
         for field in root_fields:
-            if field.arguments:
-                # Analyze the arguments to determine the query type
-                # Check if any argument is a filter (starts with min/max or is boolean)
-                has_filter_args = any(
-                    arg_name.startswith("min") or arg_name.startswith("max") or 
-                    arg_value.lower() in ("true", "false")
-                    for arg_name, arg_value in field.arguments
-                )
+            # Filtering queries (e.g., users with age/role filters) are rewritten;
+            # lookups (e.g., project(name: "GraphQL")) already reach their object
+            if field.is_filtering:
+                singular_name = field.name[:-1] if field.name.endswith("s") else field.name
+                plural_name = field.name
+                record_var = f"{singular_name.upper()}_ID"
                 
-                # Check if any arguments match exact name pattern (like "name", "id")
-                has_lookup_args = any(
-                    arg_name in ("id", "name", "key", "slug", "code")
-                    for arg_name, _ in field.arguments
-                )
+                # Filter the records by explicitly accessing the individual records
+                # that satisfy the filter conditions in the result rule
+                filtered_parts = [
+                    f"{plural_name}_ext(ROOT)",        # Start from root
+                    f"{plural_name}_result(ROOT)",     # Apply filters from result rule
+                    f"{singular_name}_ext(ROOT, {record_var})",  # Get record IDs that match criteria
+                    f"{singular_name.upper()}_1 = {record_var}"  # Connect to the result fields
+                ]
                 
-                # Different handling based on query type
-                if has_filter_args and not has_lookup_args:
-                    # This is a filtering query (e.g., users with age/role filters)
-                    singular_name = field.name[:-1] if field.name.endswith("s") else field.name
-                    plural_name = field.name
-                    record_var = f"{singular_name.upper()}_ID"
-                    
-                    # Filter the records by explicitly accessing the individual records
-                    # that satisfy the filter conditions in the result rule
-                    filtered_parts = [
-                        f"{plural_name}_ext(ROOT)",        # Start from root
-                        f"{plural_name}_result(ROOT)",     # Apply filters from result rule
-                        f"{singular_name}_ext(ROOT, {record_var})",  # Get record IDs that match criteria
-                        f"{singular_name.upper()}_1 = {record_var}"  # Connect to the result fields
-                    ]
-                    
-                    # Keep non-filter predicate parts
-                    other_parts = [
-                        part for part in unique_body_parts 
-                        if not part.startswith(f"{plural_name}_ext") and not part.startswith(f"{plural_name}_result")
-                    ]
-                    
-                    unique_body_parts = filtered_parts + other_parts
-                    break
-                elif has_lookup_args:
-                    # This is a lookup query (e.g., project(name: "GraphQL"))
-                    # No need to rewrite the query pattern, just ensure connection to result predicates
-                    # The original query will work because it directly looks up the object
-                    pass
+                # Keep non-filter predicate parts
+                other_parts = [
+                    part for part in unique_body_parts 
+                    if not part.startswith(f"{plural_name}_ext") and not part.startswith(f"{plural_name}_result")
+                ]
                 
+                unique_body_parts = filtered_parts + other_parts
+                break
+
         body = ', '.join(unique_body_parts)
         rules.append(f"{head} :- {body}.")
     else:
         # No variables found, create a simple answer predicate
         rules.append("ans :- true.")
 
-    # Add a comment explaining the answer predicate
-    rules.insert(-1, "% Final answer predicate combining all query results")
+
+#
+# Compiled query cache
+#
+
+# A query's shape: name, arguments, variables and subfield shapes of every
+# field. Two query trees with the same shape generate the same XSB code.
+QueryShape = Tuple[Tuple[str, Tuple[Tuple[str, str], ...], str, str, tuple], ...]
+
+
+def query_shape(query: List[QueryField]) -> QueryShape:
+    """Return the hashable shape of a list of query fields."""
+    # list every field with an explicit stack, parents before their
+    # subfields, then build the entries in reverse, so each field's
+    # subfield entries already exist
+    order: List[QueryField] = []
+    stack = list(query)
+    while stack:
+        f = stack.pop()
+        order.append(f)
+        stack.extend(f.subfields)
+    shapes: Dict[int, tuple] = {}
+    for f in reversed(order):
+        shapes[id(f)] = (
+            f.name, tuple(f.arguments), f.parent_var, f.child_var,
+            tuple([shapes[id(sub)] for sub in f.subfields]),
+        )
+    return tuple([shapes[id(f)] for f in query])
+
+
+# Generated code per (query shape, apply_demand), oldest entry evicted first
+_compiled_queries: Dict[Tuple[QueryShape, bool], str] = {}
+_COMPILED_QUERIES_MAX = 256
 
 
 def generate_xsb_for_query(schema: List[SchemaType], query: List[QueryField], apply_demand: bool = False) -> str:
@@ -692,6 +877,11 @@ def generate_xsb_for_query(schema: List[SchemaType], query: List[QueryField], ap
     2. Optionally applying demand transformation
     3. Generating appropriate XSB predicates and rules
 
+    Code is compiled once per query shape and reused for every later query
+    with the same fields, arguments and variables. The schema does not
+    affect the generated code. A first translation pays only for building
+    the shape on top of generation.
+
     Args:
         schema: Parsed GraphQL schema
         query: Parsed GraphQL query
@@ -700,23 +890,40 @@ def generate_xsb_for_query(schema: List[SchemaType], query: List[QueryField], ap
     Returns:
         Generated XSB Datalog code as a string
     """
-    result_sections = []
-    demand_info_map = {}
+    key = (query_shape(query), apply_demand)
+    code = _compiled_queries.get(key)
+    if code is None:
+        # generation leaves the fields untouched, so it runs on the
+        # caller's tree
+        code = _generate_xsb(query, apply_demand)
+        if len(_compiled_queries) >= _COMPILED_QUERIES_MAX:
+            del _compiled_queries[next(iter(_compiled_queries))]
+        _compiled_queries[key] = code
+    return code
+
+
+def _generate_xsb(query: List[QueryField], apply_demand: bool) -> str:
+    """Generate XSB code for `query`; see `generate_xsb_for_query`."""
+    # All output lines go into one flat list, joined once at the end; a
+    # blank line separates sections
+    lines: List[str] = []
+    demand_info_map: Dict[str, DemandInfo] = {}
+
+    def new_section() -> None:
+        if lines:
+            lines.append("")
 
     # Add header comment describing the output
     if query:
         root_names = ", ".join([f.name for f in query])
-        header = [
-            f"% XSB Datalog generated from GraphQL query with root fields: {root_names}",
-            f"% {'With' if apply_demand else 'Without'} demand transformation"
-        ]
-        result_sections.append("\n".join(header))
+        lines.append(f"% XSB Datalog generated from GraphQL query with root fields: {root_names}")
+        lines.append(f"% {'With' if apply_demand else 'Without'} demand transformation")
 
     # Apply demand transformation if requested
     if apply_demand:
-        demand_facts = ["% Demand transformation facts and rules"]
-        demand_rules = []
-        seen_demand_rules = set()
+        demand_facts: List[str] = ["% Demand transformation facts and rules"]
+        demand_rules: List[str] = []
+        seen_demand_rules: Set[Tuple] = set()
 
         # Apply demand transformation to each root field
         for field in query:
@@ -724,43 +931,40 @@ def generate_xsb_for_query(schema: List[SchemaType], query: List[QueryField], ap
             if info.applied:
                 demand_info_map[field.name] = info
 
-        # Add demand facts and rules to result sections
+        # Add demand facts and rules as two sections
         if len(demand_facts) > 1 or demand_rules:  # Only add if there are actual rules
-            result_sections.append("\n".join(demand_facts))
-            result_sections.append("\n".join(demand_rules))
+            new_section()
+            lines.extend(demand_facts)
+            new_section()
+            lines.extend(demand_rules or [""])
 
     # Generate predicates and rules for each root field and its subfields
-    predicate_rules = ["% Query field rules"]
+    new_section()
+    lines.append("% Query field rules")
 
     for field in query:
         # Get demand info for this field if available
         demand_info = demand_info_map.get(field.name)
 
         # Add comment for this field's rules
-        predicate_rules.append(f"\n% Rules for field: {field.name}")
+        lines.append(f"\n% Rules for field: {field.name}")
 
         # Generate predicates for this field
-        generate_predicate_rules(field, [], predicate_rules, demand_info)
-
-    # Add predicate rules to result sections
-    result_sections.append("\n".join(predicate_rules))
+        generate_predicate_rules(field, [], lines, demand_info)
 
     # Generate the final answer predicate
-    answer_rules = []
-    generate_answer_predicate(query, answer_rules)
-
-    # Add answer rules to result sections
-    result_sections.append("\n".join(answer_rules))
+    new_section()
+    generate_answer_predicate(query, lines)
 
     # Add comments about applied transformations
     if demand_info_map:
-        transformation_notes = ["% Demand transformation summary"]
+        new_section()
+        lines.append("% Demand transformation summary")
         for field_name, info in demand_info_map.items():
-            transformation_notes.append(f"% NOTE: {info.log_message()}")
-        result_sections.append("\n".join(transformation_notes))
+            lines.append(f"% NOTE: {info.log_message()}")
 
     # Return the resulting XSB code
-    return "\n\n".join(result_sections)
+    return "\n".join(lines)
 
 
 def translate_graphql_to_xsb(schema_path: str, query_path: str, apply_demand: bool = False) -> str:
@@ -772,8 +976,9 @@ def translate_graphql_to_xsb(schema_path: str, query_path: str, apply_demand: bo
     2. Parses the GraphQL query file
     3. Generates XSB Datalog code from the parsed representations
 
-    This implementation handles special test cases with hardcoded outputs for exact matching,
-    and falls back to the generic implementation for other cases.
+    Both files go through the parse caches of `parse_schema` and
+    `parse_query`, keyed by file contents, so translating the demand and
+    no-demand variants of a test parses each file once.
 
     Args:
         schema_path: Path to the GraphQL schema file
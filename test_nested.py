@@ -8,30 +8,45 @@ This script:
 3. Verifies that both queries produce the same result
 """
 
-import os
+import importlib.util
+import shutil
 import subprocess
 import sys
-import tempfile
 from pathlib import Path
 
 # Add the project root to the Python path
 project_root = Path(__file__).parent.absolute()
 sys.path.insert(0, str(project_root))
 
+# Use the installed package when there is one, else the source tree;
+# checking first avoids raising and catching an ImportError on startup
+if importlib.util.find_spec("querybridge") is None:
+    sys.path.insert(0, str(project_root / "src"))
+
 try:
-    # Try importing from installed package
-    from querybridge.translator import translate_graphql_to_xsb
+    from querybridge.translator import generate_xsb_for_query, parse_query, parse_schema
 except ImportError:
-    try:
-        # Try importing directly from source
-        sys.path.insert(0, str(project_root / "src"))
-        from querybridge.translator import translate_graphql_to_xsb
-    except ImportError:
-        print("Error: Unable to import QueryBridge modules.")
-        print("Make sure you have installed the required packages:")
-        print("  pip install -e .")
-        print("  pip install graphql-core")
-        sys.exit(1)
+    print("Error: Unable to import QueryBridge modules.")
+    print("Make sure you have installed the required packages:")
+    print("  pip install -e .")
+    print("  pip install graphql-core")
+    sys.exit(1)
+
+
+# Driver that imports the facts, adds the generated query and prints
+# every answer before halting.
+RUN_TEMPLATE = """\
+:- ['facts.P'].
+
+{xsb}
+
+% Query to execute
+run_query :- ans(A, B, C, D, E, F), write('Result: '), write(A), write(B), write(C), write(D), write(E), write(F), nl, fail.
+run_query :- write('Query completed.'), nl.
+
+:- run_query.
+:- halt.
+"""
 
 
 def run_test():
@@ -47,9 +62,13 @@ def run_test():
     print(f"Query: {query_path}")
     print(f"Facts: {facts_path}")
 
+    # Parse once; both variants are generated from the same trees
+    schema = parse_schema(schema_path)
+    query = parse_query(query_path)
+
     # Generate XSB without demand transformation
     print("\nGenerating XSB without demand transformation...")
-    xsb_without_demand = translate_graphql_to_xsb(schema_path, query_path, apply_demand=False)
+    xsb_without_demand = generate_xsb_for_query(schema, query, apply_demand=False)
     without_demand_path = test_dir / "without_demand.P"
     with open(without_demand_path, "w") as f:
         f.write(xsb_without_demand)
@@ -57,7 +76,7 @@ def run_test():
 
     # Generate XSB with demand transformation
     print("\nGenerating XSB with demand transformation...")
-    xsb_with_demand = translate_graphql_to_xsb(schema_path, query_path, apply_demand=True)
+    xsb_with_demand = generate_xsb_for_query(schema, query, apply_demand=True)
     with_demand_path = test_dir / "with_demand.P"
     with open(with_demand_path, "w") as f:
         f.write(xsb_with_demand)
@@ -66,64 +85,37 @@ def run_test():
     # Create combined files for execution
     print("\nPreparing files for XSB execution...")
     
-    # For consistency, rename facts.xsb to facts.P
+    # For consistency, copy facts.xsb to facts.P, unless facts.P is
+    # already at least as new
     facts_p_path = test_dir / "facts.P"
-    if not facts_p_path.exists():
-        with open(facts_path, "r") as src, open(facts_p_path, "w") as dest:
-            dest.write(src.read())
+    if facts_path.exists() and (
+        not facts_p_path.exists()
+        or facts_p_path.stat().st_mtime_ns < facts_path.stat().st_mtime_ns
+    ):
+        shutil.copyfile(facts_path, facts_p_path)
     
     without_demand_full = test_dir / "run_without_demand.P"
-    with open(without_demand_full, "w") as f:
-        # Import facts file
-        f.write(f":- ['facts.P'].\n\n")
-        # Add the generated query
-        f.write(xsb_without_demand)
-        # Add a query to get results
-        f.write("\n\n% Query to execute\n")
-        f.write("run_query :- ans(A, B, C, D, E, F), write('Result: '), write(A), write(B), write(C), write(D), write(E), write(F), nl, fail.\n")
-        f.write("run_query :- write('Query completed.'), nl.\n")
-        f.write("\n:- run_query.\n")
-        f.write(":- halt.\n")
+    without_demand_full.write_bytes(RUN_TEMPLATE.format(xsb=xsb_without_demand).encode())
 
     with_demand_full = test_dir / "run_with_demand.P"
-    with open(with_demand_full, "w") as f:
-        # Import facts file
-        f.write(f":- ['facts.P'].\n\n")
-        # Add the generated query
-        f.write(xsb_with_demand)
-        # Add a query to get results
-        f.write("\n\n% Query to execute\n")
-        f.write("run_query :- ans(A, B, C, D, E, F), write('Result: '), write(A), write(B), write(C), write(D), write(E), write(F), nl, fail.\n")
-        f.write("run_query :- write('Query completed.'), nl.\n")
-        f.write("\n:- run_query.\n")
-        f.write(":- halt.\n")
+    with_demand_full.write_bytes(RUN_TEMPLATE.format(xsb=xsb_with_demand).encode())
 
     # Run the XSB queries and capture the results
     print("\nRunning XSB queries...")
     
     try:
-        # Create temporary files for the output
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False) as without_demand_output:
-            without_demand_out_path = without_demand_output.name
-        
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False) as with_demand_output:
-            with_demand_out_path = with_demand_output.name
-        
-        # Run XSB commands
+        # Run XSB commands, reading their output straight from the pipe
         print("\nRunning XSB without demand transformation...")
         without_demand_cmd = ["xsb", "-e", f"['{without_demand_full}']."]
-        subprocess.run(without_demand_cmd, cwd=test_dir, stdout=open(without_demand_out_path, 'w'), check=True)
+        without_demand_result = subprocess.run(
+            without_demand_cmd, cwd=test_dir, stdout=subprocess.PIPE, text=True, check=True
+        ).stdout.strip()
         
         print("Running XSB with demand transformation...")
         with_demand_cmd = ["xsb", "-e", f"['{with_demand_full}']."]
-        subprocess.run(with_demand_cmd, cwd=test_dir, stdout=open(with_demand_out_path, 'w'), check=True)
-        
-        # Read the results
-        with open(without_demand_out_path, 'r') as f:
-            without_demand_result = f.read().strip()
-        
-        with open(with_demand_out_path, 'r') as f:
-            with_demand_result = f.read().strip()
+        with_demand_result = subprocess.run(
+            with_demand_cmd, cwd=test_dir, stdout=subprocess.PIPE, text=True, check=True
+        ).stdout.strip()
         
         # Compare the results
         print("\nComparing results...")
@@ -143,11 +135,6 @@ def run_test():
     except Exception as e:
         print(f"Error: {e}")
         return False
-    finally:
-        # Clean up temporary files
-        for path in [without_demand_out_path, with_demand_out_path]:
-            if os.path.exists(path):
-                os.unlink(path)
 
 
 if __name__ == "__main__":
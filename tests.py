@@ -5,46 +5,79 @@ tests.py – Run QueryBridge end-to-end tests over every folder inside tests/
 For each subfolder in `tests/`, this script will:
 
 1. Locate `schema.graphql`, `query.graphql`, and either `facts.xsb` or `facts.P`.
-2. If only `facts.xsb` is present, copy it to `facts.P`.
+2. If `facts.xsb` is present and `facts.P` is missing or older, copy it to `facts.P`.
 3. Generate XSB code with and without demand transformation.
-4. Produce two Prolog driver files that load `facts.P` and the generated code,
-   issue the `ans/...` query, and halt.
-5. Invoke XSB on each driver and compare their outputs.
+4. Produce two Prolog driver files holding the generated code and a
+   `run_query` goal that prints every `ans/...` answer. Drivers go to a
+   private per-user scratch directory (tmpfs when available), are named
+   by a digest of their contents and are kept between runs, so XSB reuses
+   their `.xwam` files. Drivers no test used in this run are removed at the end.
+5. Start one XSB session per variant, load `facts.P` into each (from its
+   kept `facts.xwam` after the first run), run each driver in its own
+   session and compare their outputs.
 6. Report pass/fail per test and exit nonzero if any fail.
 
 Optional override of the XSB executable via environment variable `XSB_PATH` (defaults to `xsb`).
 """
+import contextlib
+import hashlib
+import importlib.util
+import io
+import multiprocessing
 import os
 import re
-import subprocess
+import shutil
 import sys
-import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from cleanup import clean
-import ast
-from typing import List
+from cleanup import cleanup_test_directory
+from xsb_worker import XSBWorker
+from typing import List, Optional, Set, Tuple
+
+# Any single-level “[<number>(,<number>)*]”, capturing what is inside
+# the brackets
+_ARRAY_RE = re.compile(r'\[\s*(\d+\s*(?:,\s*\d+)*)\s*\]')
+
+# A whole-line `%` comment in generated code, with its newline
+_COMMENT_LINE_RE = re.compile(r'^[ \t]*%.*\n?', re.MULTILINE)
 
 def extract_arrays(text: str) -> List[List[int]]:
     """
     Find all occurrences of “[<digits, optional spaces, commas>]” in the input
     and return them as Python lists of ints.
     """
-    # This regex matches any single-level “[<number>(,<number>)*]”
-    array_pattern = re.compile(r'\[\s*(?:\d+\s*(?:,\s*\d+)*)\s*\]')
-    raw_arrays = array_pattern.findall(text)
-    result: List[List[int]] = []
-    for arr in raw_arrays:
-        # ast.literal_eval turns the string "[65,108,…]" into [65,108,…]
-        parsed = ast.literal_eval(arr)
-        if isinstance(parsed, list) and all(isinstance(n, int) for n in parsed):
-            result.append(parsed)
-    return result
+    # the regex only admits digits, commas and spaces, so the captured
+    # elements can be split out and converted directly (int() ignores the
+    # spaces)
+    return [[int(tok) for tok in inner.split(',')] for inner in _ARRAY_RE.findall(text)]
 
 def decode_arrays(arrays: List[List[int]]) -> List[str]:
     """
     Given a list of lists of ASCII codes, return their decoded strings.
     """
-    return ["".join(chr(code) for code in arr) for arr in arrays]
+    return [_decode_codes(arr) for arr in arrays]
+
+def _decode_codes(arr: List[int]) -> str:
+    # one C-level pass for codes below 256 (latin-1 maps each byte to the
+    # code point of the same value, as chr() does)
+    try:
+        return bytes(arr).decode('latin-1')
+    except ValueError:
+        # a code point beyond one byte
+        return "".join(map(chr, arr))
+
+def answer_vars(code: str) -> Optional[str]:
+    """
+    Return the argument list of the `ans(...)` head in generated code, or
+    None if it has none. The answer predicate is generated last, so
+    searching back from the end only touches the tail of the code.
+    """
+    start = code.rfind("\nans(")
+    if start < 0:
+        return None
+    start += len("\nans(")
+    return code[start:code.find(")", start)]
 
 def extract_and_decode(text: str) -> List[str]:
     """
@@ -61,137 +94,237 @@ tests_root = project_root / "tests"
 # allow overriding XSB binary
 XSB = os.environ.get("XSB_PATH", "xsb")
 
-# ensure we can import translate_graphql_to_xsb
+# seconds any one XSB goal may take before its test fails
+XSB_TIMEOUT = 300
+
+# ensure we can import the translator: the installed package when there
+# is one, else the source tree (checked first, so no ImportError is
+# raised and caught on the way)
 sys.path.insert(0, str(project_root))
+if importlib.util.find_spec("querybridge") is None:
+    sys.path.insert(0, str(project_root / "src"))
 try:
-    from querybridge.translator import translate_graphql_to_xsb
+    from translation_cache import scratch_dir, translate_variants, write_atomic
 except ImportError:
-    sys.path.insert(0, str(project_root / "src"))
-    try:
-        from querybridge.translator import translate_graphql_to_xsb
-    except ImportError:
-        print("Error: Could not import `translate_graphql_to_xsb`.")
-        print("Make sure you've done `pip install -e .` in the repo root.")
-        sys.exit(1)
+    print("Error: Could not import `querybridge.translator`.")
+    print("Make sure you've done `pip install -e .` in the repo root.")
+    sys.exit(1)
+
 
+# Driver files for every test, with the .xwam files XSB compiles from them
+DRIVER_DIR = Path(scratch_dir()) / "querybridge_tests"
 
-def run_test_for_dir(test_dir: Path) -> bool:
+# Prolog driver: the generated rules followed by this footer, a
+# run_query/0 that prints every ans/N answer. It is consulted into an XSB
+# session that already holds the facts.
+RUN_FOOTER = """
+
+% execute all answers
+run_query :- ans({vars}), write('Result: '), write([{vars}]), nl, fail.
+run_query :- write('Query completed.'), nl.
+"""
+
+
+@lru_cache(maxsize=32)
+def run_footer(var_list: str) -> str:
+    """`RUN_FOOTER` for one ans/N variable list, formatted once."""
+    return RUN_FOOTER.format(vars=var_list)
+
+
+def run_test_for_dir(
+    test_dir: Path, keep: Optional[Set[str]] = None, drivers: Optional[Set[str]] = None
+) -> bool:
+    """
+    Run one test folder. The name of the compiled facts file is added to
+    `keep` when given, so a cleanup can leave it in place for the next run,
+    and the names of the drivers it ran are added to `drivers`, so
+    `prune_drivers` can leave those in place.
+    """
     print(f"\n=== Running test in {test_dir.name} ===")
 
     schema = test_dir / "schema.graphql"
     query  = test_dir / "query.graphql"
 
     # locate facts file (either facts.P or facts.xsb)
-    facts_candidates = [test_dir / "facts.P", test_dir / "facts.xsb"]
-    facts_src = next((p for p in facts_candidates if p.exists()), None)
-    if not (schema.exists() and query.exists() and facts_src):
+    facts_p = test_dir / "facts.P"
+    facts_xsb = test_dir / "facts.xsb"
+    has_p, has_xsb = facts_p.exists(), facts_xsb.exists()
+    if not (schema.exists() and query.exists() and (has_p or has_xsb)):
         print(f"  SKIP: missing schema.graphql, query.graphql, or facts.P/xsb in {test_dir}")
         return True
 
-    facts_p = test_dir / "facts.P"
-    if facts_src.name.endswith(".xsb"):
-        # copy xsb → P
-        facts_p.write_text(facts_src.read_text())
-    else:
-        # facts_src is already facts.P; no action needed
-        pass
-
-    # generate two variants
-    print("  Generating XSB (no demand)...", end="", flush=True)
-    code_no = translate_graphql_to_xsb(schema, query, apply_demand=False)
-    print(" done.")
-    print("  Generating XSB (with demand)...", end="", flush=True)
-    code_yes = translate_graphql_to_xsb(schema, query, apply_demand=True)
-    print(" done.")
-
-    # detect arity of ans/... by regex on the no-demand code
-    m = re.search(r"\bans\(([^)]+)\)", code_no)
-    if not m:
-        print("  ERROR: could not find `ans(...)` in generated code")
-        return False
-    arity = len(m.group(1).split(","))
-    vars_ = [f"V{i}" for i in range(1, arity + 1)]
-    var_list = ", ".join(vars_)
-
-    # helper to write a driver file
-    def write_driver(name: str, generated_code: str) -> Path:
-        driver = test_dir / name
-        with driver.open("w") as f:
-            f.write(f":- ['facts.P'].\n\n")
-            f.write(generated_code)
-            f.write("\n\n% execute all answers\n")
-            f.write(
-                "run_query :- ans("
-                + var_list
-                + "), write('Result: '), write(["
-                + var_list
-                + "]), nl, fail.\n"
-            )
-            f.write("run_query :- write('Query completed.'), nl.\n")
-            f.write("\n:- run_query.\n:- halt.\n")
-        return driver
-
-    drv_no  = write_driver("run_without_demand.P", code_no)
-    drv_yes = write_driver("run_with_demand.P",    code_yes)
-
-    # run XSB on each, capturing stdout
-    def exec_xsb(driver: Path) -> str:
-        out = tempfile.NamedTemporaryFile(mode="w+", delete=False)
-        try:
-            subprocess.run(
-                [XSB, "-e", f"['{driver.name}']."],
-                cwd=test_dir,
-                stdout=out,
-                stderr=subprocess.PIPE,
-                check=True,
-            )
-            out.flush()
-            return Path(out.name).read_text().strip()
-        finally:
-            out.close()
-            os.unlink(out.name)
+    # refresh facts.P from facts.xsb only when it is missing or older;
+    # copy byte for byte (sendfile on Linux, no decode)
+    if has_xsb and (not has_p or facts_p.stat().st_mtime_ns < facts_xsb.stat().st_mtime_ns):
+        shutil.copyfile(facts_xsb, facts_p)
+    # consulting facts.P compiles it to facts.xwam, which XSB reuses on
+    # later runs until facts.P is newer
+    if keep is not None:
+        keep.add(facts_p.with_suffix(".xwam").name)
 
-    try:
-        print("  Running XSB (no demand)...", end="", flush=True)
-        res_no = exec_xsb(drv_no)
-        print(" done.")
-        print("  Running XSB (with demand)...", end="", flush=True)
-        res_yes = exec_xsb(drv_yes)
+    # start XSB and send it the facts before translating, so its startup
+    # and the facts load overlap the translation below. Each variant gets
+    # its own session, so the demand program cannot lean on a rule left
+    # behind by the no-demand one.
+    with XSBWorker(XSB, cwd=test_dir, timeout=XSB_TIMEOUT) as xsb_no, \
+            XSBWorker(XSB, cwd=test_dir, timeout=XSB_TIMEOUT) as xsb_yes:
+        xsb_no.submit("['facts.P']")
+
+        # generate two variants from one read (and, if uncached, one parse)
+        # of the schema and query
+        print("  Generating XSB (no demand, with demand)...", end="", flush=True)
+        code_no, code_yes = translate_variants(schema, query)
         print(" done.")
-    except subprocess.CalledProcessError as e:
-        print(f"\n  ERROR: XSB failed: {e.stderr.decode().strip()}")
-        return False
 
-    # compare
+        # take the variables of the ans/... head from the no-demand code
+        var_list = answer_vars(code_no)
+        if not var_list:
+            print("  ERROR: could not find `ans(...)` in generated code")
+            return False
+
+        # helper to write a driver file into DRIVER_DIR, named by a digest
+        # of its contents, so an existing file is already the right driver
+        # and is left alone: it keeps its mtime, and the .xwam XSB compiled
+        # from it stays valid across runs
+        def write_driver(variant: str, generated_code: str) -> Path:
+            text = generated_code + run_footer(var_list)
+            digest = hashlib.sha1(text.encode()).hexdigest()
+            driver = DRIVER_DIR / f"{variant}_{digest}.P"
+            if not driver.exists():
+                DRIVER_DIR.mkdir(parents=True, exist_ok=True)
+                write_atomic(driver, text)
+            return driver
+
+        # programs identical but for their comments (the header names the
+        # variant) give identical answers, so one driver (and one run
+        # below) serves both variants
+        same_code = (_COMMENT_LINE_RE.sub("", code_no)
+                     == _COMMENT_LINE_RE.sub("", code_yes))
+        drv_no  = write_driver("without_demand", code_no)
+        drv_yes = drv_no if same_code else write_driver("with_demand", code_yes)
+        if drivers is not None:
+            drivers.update((drv_no.name, drv_yes.name))
+
+        # run each driver in its session: load it (compiling it to .xwam
+        # if another test has not already) and collect what run_query
+        # prints
+        def run_driver(xsb: XSBWorker, driver: Path) -> List[str]:
+            xsb.load_compiled(driver)
+            return xsb.run("run_query")
+
+        try:
+            print("  Running XSB (no demand, with demand)...", end="", flush=True)
+            xsb_no.collect()  # the facts load sent above
+            if not same_code:
+                # facts.xwam is current now, so this session only loads
+                # it, while the no-demand driver runs
+                xsb_yes.submit("['facts.P']")
+            res_no = run_driver(xsb_no, drv_no)
+            if same_code:
+                res_yes = res_no
+            else:
+                xsb_yes.collect()
+                res_yes = run_driver(xsb_yes, drv_yes)
+            print(" done.")
+        except RuntimeError as e:
+            print(f"\n  ERROR: {e}")
+            return False
+
+    # compare line lists: a different line count fails at once, and
+    # otherwise lines are compared only up to the first difference, with
+    # no joined copy of either output
     if res_no == res_yes:
-        # print(extract_and_decode(res_no))
+        # print(extract_and_decode("\n".join(res_no)))
         print("   PASS: outputs match")
         return True
     else:
         print("   FAIL: outputs differ")
-        print("    -- without demand:\n    " + "\n    ".join(res_no.splitlines()))
-        print("    -- with demand:\n    "    + "\n    ".join(res_yes.splitlines()))
+        print("    -- without demand:\n    " + "\n    ".join(res_no))
+        print("    -- with demand:\n    "    + "\n    ".join(res_yes))
         return False
 
 
+def run_test_captured(test_dir: Path) -> Tuple[bool, str, Set[str]]:
+    """
+    Run one test folder and return its result with everything it printed
+    and the names of the drivers it ran.
+    """
+    buf = io.StringIO()
+    keep: Set[str] = set()
+    drivers: Set[str] = set()
+    with contextlib.redirect_stdout(buf):
+        try:
+            ok = run_test_for_dir(test_dir, keep, drivers)
+        finally:
+            # each worker removes the generated files left in its own test
+            # folder, except the compiled facts, which the next run reuses
+            cleanup_test_directory(test_dir, supress=True, keep=keep)
+    return ok, buf.getvalue(), drivers
+
+
+def prune_drivers(used: Set[str]) -> None:
+    """
+    Remove the files in DRIVER_DIR that belong to no driver in `used`:
+    drivers (and their .xwam) of queries or translator versions no longer
+    tested, and links left by interrupted compiles.
+    """
+    stems = {Path(name).stem for name in used}
+    try:
+        with os.scandir(DRIVER_DIR) as entries:
+            stale = [e.path for e in entries if os.path.splitext(e.name)[0] not in stems]
+    except FileNotFoundError:
+        return
+    for path in stale:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
 def main():
     if not tests_root.is_dir():
         print("Error: no tests/ folder found")
         sys.exit(1)
 
-    subdirs = [d for d in sorted(tests_root.iterdir()) if d.is_dir()]
+    # scandir entries carry their file type, so no stat per entry
+    with os.scandir(tests_root) as entries:
+        subdirs = sorted(Path(e.path) for e in entries if e.is_dir())
     if not subdirs:
         print("Error: tests/ has no subdirectories to run")
         sys.exit(1)
 
+    # each test only touches its own folder, so run them side by side;
+    # reports are buffered per test and printed in folder order
     total = len(subdirs)
     passed = 0
-    for d in subdirs:
-        if run_test_for_dir(d):
-            passed += 1
+    workers = min(os.cpu_count() or 1, total)
+
+    # on Linux, translate one test up front, so graphql-core's first-use
+    # setup runs once here; forked workers inherit it, along with the
+    # translation and parse caches, instead of each paying for it. Other
+    # platforms keep their default start method, since forking is unsafe
+    # on macOS once threads or system frameworks are running.
+    ctx = None
+    if sys.platform.startswith("linux"):
+        ctx = multiprocessing.get_context("fork")
+        warm = next((d for d in subdirs
+                     if (d / "schema.graphql").exists() and (d / "query.graphql").exists()), None)
+        if warm is not None:
+            translate_variants(warm / "schema.graphql", warm / "query.graphql")
+
+    used: Set[str] = set()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as ex:
+        for ok, report, drivers in ex.map(run_test_captured, subdirs):
+            print(report, end="")
+            used |= drivers
+            if ok:
+                passed += 1
+
+    # drivers are shared between tests, so they are pruned here, once
+    # every test is done with them
+    prune_drivers(used)
 
     print(f"\nSummary: {passed}/{total} tests passed.")
-    clean(supress=True)
     sys.exit(0 if passed == total else 1)
 
 
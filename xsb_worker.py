@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Long-lived XSB process for QueryBridge scripts.
+
+Starting XSB and loading its libraries costs far more than running the
+small queries the tests and benchmarks issue. `XSBWorker` starts one
+interactive XSB process and feeds it goals over stdin, reading each
+goal's output back up to a sentinel line.
+
+```python
+with XSBWorker("xsb", cwd=test_dir) as xsb:
+    xsb.consult("run_with_demand.P")
+    lines = xsb.run("run_query")
+```
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Optional, Union
+
+
+# Marker written after every goal sent to the XSB session.
+SENTINEL = "---RUN-END---"
+
+# Marker written, followed by the error term, when a goal throws.
+ERROR_MARK = "---RUN-ERROR---"
+
+# XSB's own replies to a goal, not part of its output.
+_REPLIES = frozenset({"yes", "no"})
+
+
+class XSBWorker:
+    """An interactive XSB process that runs goals on request."""
+
+    def __init__(
+        self,
+        xsb_path: str = "xsb",
+        cwd: Optional[Union[str, Path]] = None,
+        timeout: Optional[float] = None,
+    ):
+        # seconds to wait for any one goal before killing XSB (None waits
+        # for ever)
+        self.timeout = timeout
+        self._err = tempfile.TemporaryFile(mode="w+")
+        self.proc = subprocess.Popen(
+            [xsb_path, "--noprompt", "--quietload", "--nobanner"],
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._err,
+            text=True,
+            bufsize=1,
+        )
+
+    def submit(self, goal: str) -> None:
+        """
+        Send `goal` to XSB without waiting for it, so other work can overlap
+        its run; `collect` then returns its output. Goals run in the order
+        they are sent.
+        """
+        # the sentinel follows whether the goal succeeds, fails or throws,
+        # so `collect` never waits for output that will not come. `_E` keeps
+        # the toplevel from reporting a binding after the sentinel.
+        try:
+            self.proc.stdin.write(
+                f"(catch(({goal}), _E, (write('{ERROR_MARK}'), write(_E), nl))"
+                f" -> true ; true), write('{SENTINEL}'), nl, flush_output.\n"
+            )
+            self.proc.stdin.flush()
+        except BrokenPipeError:
+            pass  # XSB already exited; `collect` reports its stderr
+
+    def collect(self) -> List[str]:
+        """
+        Wait for the oldest submitted goal not yet collected and return the
+        non-empty lines it printed, without XSB's own `yes`/`no` replies.
+        Raises RuntimeError if the goal threw, or if XSB exits or runs past
+        `timeout` first.
+        """
+        expired = threading.Event()
+
+        def expire() -> None:
+            expired.set()
+            self.proc.kill()
+
+        timer = None
+        if self.timeout is not None:
+            timer = threading.Timer(self.timeout, expire)
+            timer.start()
+        lines: List[str] = []
+        error = None
+        try:
+            for ln in self.proc.stdout:
+                # output the goal left without a trailing newline shares
+                # the sentinel's line; keep the part before it
+                cut = ln.find(SENTINEL)
+                done = cut >= 0
+                if done:
+                    ln = ln[:cut]
+                mark = ln.find(ERROR_MARK)
+                if mark >= 0:
+                    error = ln[mark + len(ERROR_MARK):].strip()
+                    ln = ln[:mark]
+                ln = ln.strip()
+                if ln and ln not in _REPLIES:
+                    lines.append(ln)
+                if done:
+                    if error is not None:
+                        raise RuntimeError(f"XSB error: {error}")
+                    return lines
+        finally:
+            if timer is not None:
+                timer.cancel()
+        self.proc.wait()
+        self._err.seek(0)
+        stderr = self._err.read().strip()
+        if expired.is_set():
+            stderr = f"no reply within {self.timeout} s\n{stderr}".rstrip()
+        raise RuntimeError(f"XSB error: {stderr}")
+
+    def run(self, goal: str) -> List[str]:
+        """
+        Run `goal` once and return the non-empty lines it printed, without
+        XSB's own `yes`/`no` replies.
+        """
+        self.submit(goal)
+        return self.collect()
+
+    def consult(self, path: Union[str, Path]) -> List[str]:
+        """Load a Prolog file into the session."""
+        return self.run(f"['{path}']")
+
+    def load_compiled(self, source: Union[str, Path]) -> List[str]:
+        """
+        Load a Prolog file into the session, compiling it to .xwam first
+        if there is none. XSB compiles a private link to the file and the
+        result is renamed into place, so sessions sharing `source` never
+        load a half-written .xwam.
+        """
+        source = Path(source)
+        xwam = source.with_suffix(".xwam")
+        if not xwam.exists():
+            link = source.with_name(f"{source.stem}_{os.getpid()}.P")
+            if link.is_symlink():
+                link.unlink()
+            link.symlink_to(source.resolve())
+            try:
+                self.run(f"compile('{link.with_suffix('')}')")
+                compiled = link.with_suffix(".xwam")
+                if compiled.exists():  # else consulting reports the errors
+                    os.replace(compiled, xwam)
+            finally:
+                link.unlink()
+        return self.consult(source)
+
+    def close(self) -> None:
+        """Halt XSB and release the process."""
+        if self.proc.poll() is None:
+            try:
+                self.proc.stdin.write("halt.\n")
+                self.proc.stdin.close()
+            except OSError:
+                pass
+            self.proc.wait()
+        self.proc.stdout.close()
+        self._err.close()
+
+    def __enter__(self) -> "XSBWorker":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()